@@ -1,46 +1,87 @@
 #!/usr/bin/env python3
 import argparse
-import importlib
+import os
 import sys
-from typing import Any, Callable, List
+from typing import List, Optional
 
+from utils.bench import get_bench_parser, run_bench
 from utils.error import AdventOfCodeException
+from utils.generator import generate, get_generator_parser
+from utils.registry import Day, get_registry, get_selector_parser, parse_days
+from utils.runner import parse_jobs, run_parallel
 
-MODULES = 19
-EXCLUDE_MODULES = [10, 16, 17]
+EXCLUDE_MODULES: List[int] = []
 
 
-def get_parser() -> argparse.ArgumentParser:
-    """Create a parser for the application."""
+def get_days(argv: Optional[List[str]] = None) -> List[Day]:
+    """
+    Select the days to run without importing them.
+
+    The selection comes from '--days', otherwise from the SOLUTION
+    environment variable, otherwise every day not in EXCLUDE_MODULES.
+    """
+    args, _ = get_selector_parser().parse_known_args(argv)
+    solution = os.getenv("SOLUTION")
+    if args.days is None and solution:
+        try:
+            args.days = parse_days(solution)
+        except argparse.ArgumentTypeError as exc:
+            raise AdventOfCodeException(f"Invalid SOLUTION variable: {exc}")
+
+    registry = get_registry()
+    if args.days is None:
+        return registry.select(id for id in registry.days if id not in EXCLUDE_MODULES)
+    return registry.select(args.days)
+
+
+def get_parser(days: List[Day]) -> argparse.ArgumentParser:
+    """Create a parser for the application (only the selected days are imported)."""
     parser = argparse.ArgumentParser(
         prog="adventofcode" if __name__ == "__main__" else None,
         description="Solutions for adventofcode.",
+        parents=[get_selector_parser()] + [day.get_parser() for day in days],
     )
-    parser = argparse.ArgumentParser(
-        parents=[
-            getattr(importlib.import_module(f"day{id}"), f"get_parser_day{id}")()
-            for id in range(1, MODULES + 1)
-            if id not in EXCLUDE_MODULES
-        ]
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=parse_jobs,
+        default=0,
+        help="run each day/part in a pool of JOBS processes (default: serial)",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.add_parser(
+        "bench",
+        parents=[get_selector_parser(), get_bench_parser()],
+        help="benchmark each day/part on its data and compare with a baseline",
+    )
+    commands.add_parser(
+        "generate",
+        parents=[get_selector_parser(), get_generator_parser()],
+        help="generate reproducible inputs of a given size for each day",
     )
     return parser
 
 
 def main() -> None:
     """Main routines."""
-    p = get_parser()
+    days = get_days()
+    p = get_parser(days)
     args = p.parse_args()
 
-    # TBD take into account SOLUTION env var
-    days: List[Callable[[Any], int]] = [
-        getattr(importlib.import_module(f"day{id}"), f"day{id}")
-        for id in range(1, MODULES + 1)
-        if id not in EXCLUDE_MODULES
-    ]
+    tasks = [(day, part2) for day in days for part2 in (False, True)]
+    if args.command == "generate":
+        generate([day.id for day in days], args.size, args.seed, args.output)
+        return
+    if args.command == "bench":
+        run_bench(tasks, **vars(args))
+        return
+    if args.jobs > 0:
+        run_parallel(tasks, **vars(args))
+        return
 
     for day in days:
-        day(**vars(args))
-        day(part2=True, **vars(args))
+        day.solution(**vars(args))
+        day.solution(part2=True, **vars(args))
 
 
 if __name__ == "__main__":
@@ -1,10 +1,12 @@
 import argparse
 import os
+from array import array
 from logging import Logger
 from pathlib import Path
-from typing import List, Tuple, Union
+from typing import Dict, List, Tuple
 
 from utils.error import AdventOfCodeException
+from utils.grid import Grid
 from utils.logger import MyLogger
 
 FILE_PATH = os.path.abspath(__file__)
@@ -23,121 +25,94 @@ def get_parser_day10() -> argparse.ArgumentParser:
     day10.add_argument(
         "--data-day10", type=Path, help="data to decode", default=DEFAULT_DAY10_DATA
     )
+    day10.add_argument(
+        "--interior-day10",
+        choices=INTERIORS,
+        help="method to count the tiles enclosed by the loop",
+        default="scanline",
+    )
     return parser
 
 
-class Pipe:
-    def __init__(self, value, connect=False) -> None:
-        self._value = value
-        self._part_of_loop = connect
-        self._inside_the_loop = None
-        self.is_start = False
-
-    @property
-    def connect(self) -> bool:
-        return self._part_of_loop
-
-    @connect.setter
-    def connect(self, connect: bool):
-        self._part_of_loop = connect
-
-    @property
-    def inside(self) -> Union[bool, None]:
-        return self._inside_the_loop
-
-    @inside.setter
-    def inside(self, inside: bool):
-        self._inside_the_loop = inside
-
-    @property
-    def is_not_filled(self) -> bool:
-        return self._value != "*"
-
-    def __str__(self) -> str:
-        return self._value
-
-
 Coordonate = Tuple[int]
 
+# Methods to count the tiles enclosed by the loop:
+# - scanline: a tile is inside when the loop is crossed an odd number of times
+#   on its left (crossing the pipes connected to the north)
+# - shoelace: area of the loop polygon (shoelace formula) and Pick's theorem
+# - flood: flood the outside of the upscaled grid from its border
+INTERIORS = ("scanline", "shoelace", "flood")
+# Pipes which connect a tile to the one above
+NORTH_PIPES = ("|", "L", "J")
+
+# Directions in the order of Grid.offsets()
+NORTH, SOUTH, EAST, WEST = range(4)
+# PIPES[pipe][direction of the move into the pipe] = direction of the move out
+PIPES: Dict[str, Dict[int, int]] = {
+    "|": {NORTH: NORTH, SOUTH: SOUTH},
+    "-": {EAST: EAST, WEST: WEST},
+    "L": {SOUTH: EAST, WEST: NORTH},
+    "J": {SOUTH: WEST, EAST: NORTH},
+    "7": {NORTH: WEST, EAST: SOUTH},
+    "F": {NORTH: EAST, WEST: SOUTH},
+}
+# TURNS[ord(pipe) * 4 + direction in] = direction out (-1: not connected)
+TURNS: List[int] = [-1] * (128 * 4)
+for pipe, turns in PIPES.items():
+    for direction_in, direction_out in turns.items():
+        TURNS[ord(pipe) << 2 | direction_in] = direction_out
 
-class Maze:
-    def __init__(self) -> None:
-        self.grid: List[List[Pipe]] = []
 
-    def add_pipe(self, pipe_row: List[Pipe]):
-        self.grid.append(pipe_row)
+class Maze:
+    def __init__(self, grid: Grid) -> None:
+        self.grid = grid
+        # Flag plane of the pipes which are part of the loop
+        self.connect = grid.plane("connect")
+        # Indices in the grid of the pipes of the loop from the start
+        self.loop: array = array("q")
 
     def find_start(self) -> Coordonate:
-        return [
-            (i, j)
-            for i, row in enumerate(self.grid)
-            for j, pipe in enumerate(row)
-            if str(pipe) == "S"
-        ][0]
+        return self.grid.position(self.grid.find("S"))
 
     def get_loop_size(self) -> int:
-        row, col = self.find_start()
-        previous_pipe: Coordonate = (row, col)
-        next_pipe: Coordonate = self.find_connected_pipe(previous_pipe)[0]
-        self.get_pipe(next_pipe).connect = True
-        index = 1
-        while not self.get_pipe(next_pipe).is_start:
-            previous_pipe, next_pipe = self.next_pipe(previous_pipe, next_pipe)
-            index += 1
-        return index
-
-    def get_first_pipe_not_process(self) -> Coordonate:
-        for i, row in enumerate(self.grid):
-            for j, pipe in enumerate(row):
-                if not pipe.connect and pipe.inside is None:
-                    return (i, j)
+        self.loop = self.trace_loop()
+        return len(self.loop)
 
-    def get_neighbor(self, coord: Coordonate) -> List[Coordonate]:
-        x, y = coord
-        neighbors: List[Coordonate] = [
-            (x + 1, y),
-            (x - 1, y),
-            (x, y + 1),
-            (x, y - 1),
-            (
-                x + 1,
-                y + 1,
-            ),  # Tricky as hell: "squeezing between pipes is also allowed!"
-            (x + 1, y - 1),
-            (x - 1, y + 1),
-            (x - 1, y - 1),
-        ]
-        return [
-            (row, col)
-            for row, col in neighbors
-            if 0 <= row < len(self.grid)
-            and 0 <= col < len(self.grid[0])  # Not outside the grid
-            and not self.get_pipe((row, col)).connect
+    def trace_loop(self) -> array:
+        """
+        Follow the loop from the start with the TURNS table and return the
+        indices of its pipes. The start is replaced by its actual pipe.
+        """
+        grid, cells, step = self.grid, self.grid.cells, self.grid.offsets()
+        start = grid.find("S")
+        exits = [
+            direction
+            for direction in range(4)
+            if TURNS[cells[start + step[direction]] << 2 | direction] >= 0
         ]
-
-    def get_neighborhood(self, coord: Coordonate):
-        neighborhoods: List[Coordonate] = []
-        neighbors: List[Coordonate] = [coord]
-        while neighbors:
-            new_neighbors: List[Coordonate] = []
-            for neighbor in neighbors:
-                new_neighbors.extend(self.get_neighbor(neighbor))
-            neighborhoods.extend(neighbors)
-            neighbors = [
-                neighbor
-                for neighbor in set(new_neighbors)
-                if neighbor not in neighborhoods
-            ]
-        return neighborhoods
-
-    def is_outside_pipe(self, coord: Coordonate):
-        return (
-            coord[0] == 0
-            or coord[1] == 0
-            or coord[0] == len(self.grid) - 1
-            or coord[1] == len(self.grid[0]) - 1
+        if len(exits) != 2:
+            raise AdventOfCodeException("There are not 2 pipes connected to the start")
+        cells[start] = ord(
+            [
+                pipe
+                for pipe, turns in PIPES.items()
+                if set(turns.values()) == set(exits)
+            ][0]
         )
 
+        loop = array("q", [start])
+        direction = exits[0]
+        index = start + step[direction]
+        while index != start:
+            loop.append(index)
+            direction = TURNS[cells[index] << 2 | direction]
+            if direction < 0:
+                raise AdventOfCodeException(f"Broken loop at {grid.position(index)}")
+            index += step[direction]
+        for index in loop:
+            self.connect[index] = True
+        return loop
+
     def fill_pipes(self) -> None:
         """Pain on my a**
         Input:
@@ -160,121 +135,114 @@ class Maze:
             *.*.*.*.*.*➡️
             ***********
         """
-        row_n = len(self.grid)
-        col_n = len(self.grid[0])
-        new_grid: List[List[Pipe]] = [
-            [
-                Pipe("*") if i == 2 * row_n or j == 2 * col_n else Pipe("?")
-                for j in range(2 * col_n + 1)
-            ]
-            for i in range(2 * row_n + 1)
+        grid, connect = self.grid, self.connect
+        new_grid = Grid.from_lines(["*" * (2 * grid.cols + 1)] * (2 * grid.rows + 1))
+        new_connect = new_grid.plane("connect")
+        for i in range(grid.rows):
+            for j in range(grid.cols):
+                index, pipe = grid.index(i, j), grid[i, j]
+                center = new_grid.index(2 * i + 1, 2 * j + 1)
+                new_grid.cells[center] = grid.cells[index]
+                new_connect[center] = connect[index]
+                if pipe in ["-", "J", "7"] and connect[index]:
+                    new_grid.cells[center - 1] = ord("-")
+                    new_connect[center - 1] = True
+                if pipe in ["|", "J", "L"] and connect[index]:
+                    new_grid.cells[center - new_grid.stride] = ord("|")
+                    new_connect[center - new_grid.stride] = True
+        self.grid, self.connect = new_grid, new_connect
+
+    def get_outside(self) -> bytearray:
+        """Flood the pipes not part of the loop from the border of the grid"""
+        grid, connect = self.grid, self.connect
+        outside = grid.plane("outside")
+        neighbors: List[int] = [
+            grid.index(i, j)
+            for i in range(grid.rows)
+            for j in range(grid.cols)
+            if (i in (0, grid.rows - 1) or j in (0, grid.cols - 1))
+            and not connect[grid.index(i, j)]
         ]
-        for i in range(row_n):
-            for j in range(col_n):
-                new_grid[2 * i][2 * j] = Pipe("*")
-                new_grid[2 * i + 1][2 * j + 1] = self.grid[i][j]
-                if str(self.grid[i][j]) in ["-", "J", "7"] and self.grid[i][j].connect:
-                    new_grid[2 * i + 1][2 * j] = Pipe("-", True)
-                else:
-                    new_grid[2 * i + 1][2 * j] = Pipe("*")
-                if str(self.grid[i][j]) in ["|", "J", "L"] and self.grid[i][j].connect:
-                    new_grid[2 * i][2 * j + 1] = Pipe("|", True)
-                else:
-                    new_grid[2 * i][2 * j + 1] = Pipe("*")
-        self.grid = new_grid
+        for index in neighbors:
+            outside[index] = True
+        while neighbors:
+            # Tricky as hell: "squeezing between pipes is also allowed!"
+            for neighbor in grid.neighbors(neighbors.pop(), diagonal=True):
+                if not connect[neighbor] and not outside[neighbor]:
+                    outside[neighbor] = True
+                    neighbors.append(neighbor)
+        return outside
 
     def pipe_inside(self) -> int:
         self.fill_pipes()
-        pipe: Coordonate = self.get_first_pipe_not_process()
-        while pipe:
-            neighborhood: List[Coordonate] = self.get_neighborhood(pipe)
-            outside = any(self.is_outside_pipe(pipe) for pipe in neighborhood)
-            for pipe in neighborhood:
-                self.get_pipe(pipe).inside = not outside
-            pipe = self.get_first_pipe_not_process()
-
-        return len(
-            [
-                pipe
-                for row in self.grid
-                for pipe in row
-                if pipe.inside and pipe.is_not_filled
-            ]
+        outside = self.get_outside()
+        filler = ord("*")
+        return sum(
+            1
+            for index in self.grid.indices()
+            if not self.connect[index]
+            and not outside[index]
+            and self.grid.cells[index] != filler
         )
 
-    def print_grid(self):
-        grid = [
-            [
-                "X"
-                if pipe.connect
-                else "\033[1;31mI\033[0m"
-                if pipe.inside and pipe.is_not_filled
-                else str(pipe)
-                for pipe in row
-            ]
-            for row in self.grid
-        ]
-        for row in grid:
-            logger.debug(" ".join(row))
-
-    def get_pipe(self, coor: Coordonate) -> Pipe:
-        return self.grid[coor[0]][coor[1]]
+    def scanline_inside(self) -> int:
+        """Count the tiles enclosed by the loop, row by row (no upscaling)"""
+        grid, connect, inside = self.grid, self.connect, 0
+        north_pipes = set(map(ord, NORTH_PIPES))
+        for row in range(grid.rows):
+            crossings = 0
+            for index in grid.row_indices(row):
+                if connect[index]:
+                    crossings += grid.cells[index] in north_pipes
+                elif crossings % 2:
+                    inside += 1
+        return inside
+
+    def shoelace_inside(self) -> int:
+        """
+        Count the tiles enclosed by the loop with Pick's theorem: the area of
+        a polygon on a grid is A = I + B / 2 - 1 with I the interior points and
+        B the boundary points (the pipes of the loop).
+        """
+        # The border of the grid shifts the polygon but not its area
+        stride, area = self.grid.stride, 0
+        previous = self.loop[-1]
+        for index in self.loop:
+            x1, y1 = divmod(previous, stride)
+            x2, y2 = divmod(index, stride)
+            area += x1 * y2 - x2 * y1
+            previous = index
+        return abs(area) // 2 - len(self.loop) // 2 + 1
+
+    def count_inside(self, interior: str = "scanline") -> int:
+        if interior == "scanline":
+            return self.scanline_inside()
+        if interior == "shoelace":
+            return self.shoelace_inside()
+        if interior == "flood":
+            return self.pipe_inside()
+        raise AdventOfCodeException(f"Unknown interior method: {interior}")
 
-    def find_connected_pipe(self, coor: Coordonate) -> Tuple[Coordonate, Coordonate]:
-        if (
-            coor[0] < 0
-            or coor[1] < 0
-            or coor[0] >= len(self.grid)
-            or coor[1] >= len(self.grid[0])
-        ):
-            return ()
-        pipe_value = str(self.get_pipe(coor))
-        pipe_coords = {
-            "|": [(coor[0] + 1, coor[1]), (coor[0] - 1, coor[1])],
-            "-": [(coor[0], coor[1] + 1), (coor[0], coor[1] - 1)],
-            "L": [(coor[0] - 1, coor[1]), (coor[0], coor[1] + 1)],
-            "J": [(coor[0] - 1, coor[1]), (coor[0], coor[1] - 1)],
-            "7": [(coor[0] + 1, coor[1]), (coor[0], coor[1] - 1)],
-            "F": [(coor[0] + 1, coor[1]), (coor[0], coor[1] + 1)],
-        }
-        if pipe_value == "S":
-            adjacent_pipe: List[Coordonate] = [
-                coord
-                for coord in pipe_coords["|"] + pipe_coords["-"]
-                if coor in self.find_connected_pipe(coord)
-            ]
-            if len(adjacent_pipe) != 2:
-                raise AdventOfCodeException(
-                    "There are not 2 pipes connected to the start"
+    def print_grid(self):
+        outside = self.grid.plane("outside")
+        for row in range(self.grid.rows):
+            logger.debug(
+                " ".join(
+                    (
+                        "X"
+                        if self.connect[index]
+                        else (
+                            "\033[1;31mI\033[0m"
+                            if not outside[index] and self.grid.cells[index] != ord("*")
+                            else chr(self.grid.cells[index])
+                        )
+                    )
+                    for index in self.grid.row_indices(row)
                 )
-            start_pipe = self.get_pipe(coor)
-            start_pipe.is_start = True
-            start_pipe._value = [
-                p_type
-                for p_type, coord in pipe_coords.items()
-                if coord == adjacent_pipe
-            ][0]
-            return tuple(adjacent_pipe)
-        elif pipe_value in pipe_coords:
-            return tuple(pipe_coords[pipe_value])
-        else:
-            return ()
-
-    def next_pipe(
-        self, previous_pipe: Coordonate, pipe: Coordonate
-    ) -> Tuple[Coordonate, Coordonate]:
-        next_pipes = [
-            next_p
-            for next_p in self.find_connected_pipe(pipe)
-            if next_p != previous_pipe
-        ]
-        if len(next_pipes) != 1:
-            raise AdventOfCodeException(
-                "Unexpected error: two different pipes are required"
             )
-        next_pipe = next_pipes[0]
-        self.get_pipe(next_pipe).connect = True
-        return pipe, next_pipe
+
+    def get_pipe(self, coor: Coordonate) -> str:
+        return self.grid[coor]
 
 
 def day10(part2: bool = False, **kwargs) -> int:
@@ -292,7 +260,7 @@ def day10(part2: bool = False, **kwargs) -> int:
     maze: Maze = parse_data(kwargs["data_day10"])
     result = maze.get_loop_size() / 2
     if part2:
-        result = maze.pipe_inside()
+        result = maze.count_inside(kwargs.get("interior_day10", "scanline"))
     # Print the result
     logger.info("The solution of day10 PART%d is: %d", 2 if part2 else 1, result)
     return result
@@ -300,8 +268,6 @@ def day10(part2: bool = False, **kwargs) -> int:
 
 def parse_data(data_path: Path) -> Maze:
     """Read Each Line and parse the content"""
-    maze: Maze = Maze()
     with open(data_path, "r") as f:
-        for line in f:
-            maze.add_pipe([Pipe(x) for x in line.strip()])
-    return maze
+        lines = [line.strip() for line in f if line.strip()]
+    return Maze(Grid.from_lines(lines))
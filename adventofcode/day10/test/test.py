@@ -1,7 +1,11 @@
 import os
+import time
 import unittest
 
-from ..main import day10, parse_data
+from utils.error import AdventOfCodeException
+from utils.grid import Grid
+
+from ..main import INTERIORS, Maze, day10, parse_data
 
 FILE_PATH = os.path.abspath(__file__)
 EXAMPLE_DAY10_PART1_DATA = os.path.dirname(FILE_PATH) + "/../data/example-part1.txt"
@@ -9,6 +13,9 @@ EXAMPLE2_DAY10_PART1_DATA = os.path.dirname(FILE_PATH) + "/../data/example2-part
 EXAMPLE_DAY10_PART2_DATA = os.path.dirname(FILE_PATH) + "/../data/example-part2.txt"
 EXAMPLE2_DAY10_PART2_DATA = os.path.dirname(FILE_PATH) + "/../data/example2-part2.txt"
 EXAMPLE3_DAY10_PART2_DATA = os.path.dirname(FILE_PATH) + "/../data/example3-part2.txt"
+DATA_DAY10 = os.path.dirname(FILE_PATH) + "/../data/input.txt"
+# Maximum CPU time (in seconds) to solve both parts of the puzzle input
+TIME_BUDGET = 1.0
 
 
 class TestDay10(unittest.TestCase):
@@ -17,6 +24,28 @@ class TestDay10(unittest.TestCase):
         row, col = maze.find_start()
         self.assertEqual(str(maze.get_pipe((row, col))), "S")
 
+    def test_trace_loop(self):
+        maze = Maze(Grid.from_lines([".....", ".S-7.", ".|.|.", ".L-J.", "....."]))
+        loop = maze.trace_loop()
+        self.assertEqual(
+            [maze.grid.position(index) for index in loop],
+            [(1, 1), (2, 1), (3, 1), (3, 2), (3, 3), (2, 3), (1, 3), (1, 2)],
+        )
+        # The start is replaced by its actual pipe
+        self.assertEqual(maze.grid[1, 1], "F")
+        self.assertEqual(
+            [index for index in maze.grid.indices() if maze.connect[index]],
+            sorted(loop),
+        )
+
+    def test_trace_loop_errors(self):
+        maze = Maze(Grid.from_lines(["S-.", "..."]))
+        with self.assertRaisesRegex(AdventOfCodeException, "not 2 pipes"):
+            maze.trace_loop()
+        maze = Maze(Grid.from_lines(["S-7", "|.|", "L-."]))
+        with self.assertRaisesRegex(AdventOfCodeException, r"Broken loop at \(2, 2\)"):
+            maze.trace_loop()
+
     def test_day10_part1(self):
         result = day10(data_day10=EXAMPLE_DAY10_PART1_DATA)
         self.assertEqual(result, 4)
@@ -45,6 +74,23 @@ class TestDay10(unittest.TestCase):
         result = day10(data_day10=EXAMPLE3_DAY10_PART2_DATA, part2=True)
         self.assertEqual(result, 10)
 
+    def test_day10_interiors(self):
+        expected = {
+            EXAMPLE_DAY10_PART2_DATA: 4,
+            EXAMPLE2_DAY10_PART2_DATA: 8,
+            EXAMPLE3_DAY10_PART2_DATA: 10,
+        }
+        for interior in INTERIORS:
+            for data, inside in expected.items():
+                result = day10(data_day10=data, part2=True, interior_day10=interior)
+                self.assertEqual(result, inside)
+
+    def test_day10_time_budget(self):
+        start = time.process_time()
+        self.assertEqual(day10(data_day10=DATA_DAY10), 6812)
+        self.assertEqual(day10(data_day10=DATA_DAY10, part2=True), 527)
+        self.assertLess(time.process_time() - start, TIME_BUDGET)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,8 +1,11 @@
 import argparse
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from logging import Logger
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from utils.error import AdventOfCodeException
 from utils.logger import MyLogger
@@ -23,11 +26,63 @@ def get_parser_day12() -> argparse.ArgumentParser:
     day12.add_argument(
         "--data-day12", type=Path, help="data to decode", default=DEFAULT_DAY12_DATA
     )
+    day12.add_argument(
+        "--engine-day12",
+        choices=ENGINES,
+        help="implementation of the count of the arrangements",
+        default="suffix",
+    )
+    day12.add_argument(
+        "--jobs-day12",
+        type=int,
+        help="number of processes to count the arrangements (default: serial)",
+        default=0,
+    )
+    day12.add_argument(
+        "--unfold-day12",
+        type=parse_unfold,
+        help="number of copies of each record in part 2",
+        default=UNFOLD,
+    )
+    day12.add_argument(
+        "--stream-day12",
+        action="store_true",
+        help="count the records line by line without keeping them (no cache)",
+    )
+    day12.add_argument(
+        "--cache-day12",
+        type=Path,
+        help="JSON file of the counts to reuse between runs",
+    )
     return parser
 
 
+def parse_unfold(value: str) -> int:
+    """Parse the number of copies of a record (at least 1)"""
+    try:
+        unfold = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid unfold factor: '{value}'")
+    if unfold < 1:
+        raise argparse.ArgumentTypeError(f"the unfold factor must be >= 1: {unfold}")
+    return unfold
+
+
+# Implementations of Record.count_arrangement:
+# - suffix: dynamic programming from the last group with prefix counts, O(n*g)
+# - positions: arrangements stored by end position for each group
+ENGINES = ("suffix", "positions")
+
+
+# Number of copies of each record in part 2
+UNFOLD = 5
+# A record is identified by its pattern, its groups and its duplicate factor
+RecordKey = Tuple[str, str, int]
+
+
 class Record:
     def __init__(self, record: List[str], duplicate: int = 1) -> None:
+        self.key: RecordKey = (record[0], record[1], duplicate)
         self.spring_states: List[str] = [spring_state for spring_state in record[0]]
         self.spring_states = (self.spring_states + ["?"]) * (
             duplicate - 1
@@ -39,7 +94,46 @@ class Record:
     def __str__(self):
         return f"{''.join(self.spring_states)} {self.contiguous_group}"
 
-    def count_arrangement(self) -> int:
+    def count_arrangement(self, engine: str = "suffix") -> int:
+        if engine == "suffix":
+            return self.count_arrangement_suffix()
+        if engine == "positions":
+            return self.count_arrangement_positions()
+        raise AdventOfCodeException(f"Unknown engine: {engine}")
+
+    def count_arrangement_suffix(self) -> int:
+        """
+        Count the arrangements group by group, from the last one, in O(n*g)
+
+        ways[i] is the number of arrangements of the groups already processed
+        in spring_states[i:]. A group fits at i if there is no '.' in its
+        cells and no '#' right after it: both are checked in O(1) with the
+        prefix counts of '.' and '#'. The suffix sum of the groups (with a
+        separator between each of them) skips the positions where the
+        remaining groups can't fit.
+        """
+        springs, size = self.spring_states, len(self.spring_states)
+        # dots[i] / damaged[i]: number of '.' / '#' in springs[:i]
+        dots, damaged = [0] * (size + 1), [0] * (size + 1)
+        for i, spring in enumerate(springs):
+            dots[i + 1] = dots[i] + (spring == ".")
+            damaged[i + 1] = damaged[i] + (spring == "#")
+        # Without any group left, an arrangement can't have another '#'
+        ways = [int(damaged[i] == damaged[size]) for i in range(size + 1)] + [1]
+        needed = 0
+        for group in reversed(self.contiguous_group):
+            needed += group + (1 if needed else 0)
+            next_ways = [0] * (size + 2)
+            for i in range(size - needed, -1, -1):
+                count = next_ways[i + 1] if springs[i] != "#" else 0
+                end = i + group
+                if dots[end] == dots[i] and (end == size or springs[end] != "#"):
+                    count += ways[end + 1]
+                next_ways[i] = count
+            ways = next_ways
+        return ways[0]
+
+    def count_arrangement_positions(self) -> int:
         """
         List and count all arrangement for each spring_states
 
@@ -131,15 +225,74 @@ class Record:
         return sum(arrangements.values())
 
 
+def count_arrangement(key: RecordKey, engine: str = "suffix") -> int:
+    """Count the arrangements of a record (in a worker process)"""
+    pattern, groups, duplicate = key
+    return Record([pattern, groups], duplicate).count_arrangement(engine)
+
+
+class ArrangementCache:
+    """Number of arrangements by record content (pattern, groups, duplicate)"""
+
+    def __init__(self) -> None:
+        self.counts: Dict[RecordKey, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path: Path) -> None:
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for pattern, groups, duplicate, count in json.load(f):
+                    self.counts[(pattern, groups, duplicate)] = count
+
+    def save(self, path: Path) -> None:
+        with open(path, "w") as f:
+            json.dump([[*key, count] for key, count in self.counts.items()], f)
+
+
 class Records:
     def __init__(self) -> None:
         self.records: List[Record] = []
 
-    def add_record(self, record: str, part2: bool) -> None:
-        self.records.append(Record(record.split(), duplicate=5 if part2 else 1))
+    def add_record(self, record: str, part2: bool, unfold: int = UNFOLD) -> None:
+        self.records.append(Record(record.split(), duplicate=unfold if part2 else 1))
 
-    def count_arrangements(self) -> int:
-        return sum([record.count_arrangement() for record in self.records])
+    def count_arrangements(
+        self,
+        engine: str = "suffix",
+        jobs: int = 0,
+        cache: Optional[ArrangementCache] = None,
+    ) -> int:
+        """
+        Count the arrangements of all the records.
+
+        Only the records missing from the cache are counted, by a pool of
+        'jobs' processes if jobs > 1.
+        """
+        cache = ArrangementCache() if cache is None else cache
+        missing = list(
+            {
+                record.key: None
+                for record in self.records
+                if record.key not in cache.counts
+            }
+        )
+        cache.misses += len(missing)
+        cache.hits += len(self.records) - len(missing)
+        if jobs > 1 and len(missing) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                counts = list(
+                    executor.map(
+                        count_arrangement,
+                        missing,
+                        repeat(engine),
+                        chunksize=max(len(missing) // (jobs * 4), 1),
+                    )
+                )
+        else:
+            counts = [count_arrangement(key, engine) for key in missing]
+        cache.counts.update(zip(missing, counts))
+        return sum([cache.counts[record.key] for record in self.records])
 
 
 def day12(part2: bool = False, **kwargs) -> int:
@@ -154,17 +307,50 @@ def day12(part2: bool = False, **kwargs) -> int:
     if "data_day12" not in kwargs:
         raise AdventOfCodeException("Undefined parameter 'data_day12'")
 
-    conditions = parse_data(kwargs["data_day12"], part2)
-    result = conditions.count_arrangements()
+    engine, unfold = kwargs.get("engine_day12", "suffix"), kwargs.get(
+        "unfold_day12", UNFOLD
+    )
+    if unfold < 1:
+        raise AdventOfCodeException(f"The unfold factor must be >= 1: {unfold}")
+    if kwargs.get("stream_day12"):
+        if kwargs.get("jobs_day12") or kwargs.get("cache_day12"):
+            raise AdventOfCodeException(
+                "The streamed count can't be parallel or cached"
+            )
+        result = stream_arrangements(
+            kwargs["data_day12"], unfold if part2 else 1, engine
+        )
+    else:
+        conditions = parse_data(kwargs["data_day12"], part2, unfold)
+        # The cache only lives for this run unless it is stored in a file
+        cache, cache_path = ArrangementCache(), kwargs.get("cache_day12")
+        if cache_path:
+            cache.load(cache_path)
+        result = conditions.count_arrangements(
+            engine, kwargs.get("jobs_day12", 0), cache
+        )
+        logger.debug("Cache: %d hits, %d misses", cache.hits, cache.misses)
+        if cache_path:
+            cache.save(cache_path)
     # Print the result
     logger.info("The solution of day12 PART%d is: %d", 2 if part2 else 1, result)
     return result
 
 
-def parse_data(data_path: Path, part2=False) -> Records:
+def parse_data(data_path: Path, part2=False, unfold: int = UNFOLD) -> Records:
     """Read Each Line and parse the content"""
     records: Records = Records()
     with open(data_path, "r") as f:
         for line in f:
-            records.add_record(line.strip(), part2)
+            records.add_record(line.strip(), part2, unfold)
     return records
+
+
+def stream_arrangements(data_path: Path, duplicate: int, engine: str) -> int:
+    """Count the arrangements line by line: a record is dropped once counted"""
+    result = 0
+    with open(data_path, "r") as f:
+        for line in f:
+            if line.strip():
+                result += Record(line.split(), duplicate).count_arrangement(engine)
+    return result
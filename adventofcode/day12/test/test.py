@@ -1,7 +1,19 @@
+import argparse
 import os
+import tempfile
 import unittest
 
-from ..main import day12
+from utils.error import AdventOfCodeException
+
+from ..main import (
+    ENGINES,
+    ArrangementCache,
+    Record,
+    Records,
+    day12,
+    parse_data,
+    parse_unfold,
+)
 
 FILE_PATH = os.path.abspath(__file__)
 EXAMPLE_DAY12_PART1_DATA = os.path.dirname(FILE_PATH) + "/../data/example-part1.txt"
@@ -61,6 +73,78 @@ class TestDay12(unittest.TestCase):
         result = day12(data_day12=EXAMPLE6_DAY12_PART1_DATA, part2=True)
         self.assertEqual(result, 506250)
 
+    def test_day12_engines(self):
+        for engine in ENGINES:
+            result = day12(data_day12=EXAMPLE6_DAY12_PART1_DATA, engine_day12=engine)
+            self.assertEqual(result, 10)
+            result = day12(
+                data_day12=EXAMPLE6_DAY12_PART1_DATA, part2=True, engine_day12=engine
+            )
+            self.assertEqual(result, 506250)
+
+    def test_day12_large_duplicate(self):
+        record = Record(["?###????????", "3,2,1"], duplicate=20)
+        self.assertEqual(
+            record.count_arrangement("suffix"), record.count_arrangement("positions")
+        )
+
+    def test_day12_cache(self):
+        cache = ArrangementCache()
+        records = parse_data(EXAMPLE6_DAY12_PART1_DATA)
+        self.assertEqual(records.count_arrangements(cache=cache), 10)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(records.count_arrangements(cache=cache), 10)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # Another duplicate factor is another record
+        records = parse_data(EXAMPLE6_DAY12_PART1_DATA, part2=True)
+        self.assertEqual(records.count_arrangements(cache=cache), 506250)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_day12_cache_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.json")
+            for _ in range(2):
+                result = day12(data_day12=EXAMPLE6_DAY12_PART1_DATA, cache_day12=path)
+                self.assertEqual(result, 10)
+            cache = ArrangementCache()
+            cache.load(path)
+            self.assertEqual(cache.counts, {("?###????????", "3,2,1", 1): 10})
+
+    def test_day12_parallel(self):
+        records = Records()
+        for line in ("???.### 1,1,3", ".??..??...?##. 1,1,3", "?###???????? 3,2,1"):
+            records.add_record(line, part2=True)
+        self.assertEqual(records.count_arrangements(jobs=2), 1 + 16384 + 506250)
+
+    def test_day12_stream(self):
+        result = day12(data_day12=EXAMPLE6_DAY12_PART1_DATA, stream_day12=True)
+        self.assertEqual(result, 10)
+        result = day12(
+            data_day12=EXAMPLE6_DAY12_PART1_DATA, part2=True, stream_day12=True
+        )
+        self.assertEqual(result, 506250)
+
+    def test_day12_unfold(self):
+        for stream in (False, True):
+            result = day12(
+                data_day12=EXAMPLE2_DAY12_PART1_DATA,
+                part2=True,
+                unfold_day12=2,
+                stream_day12=stream,
+            )
+            self.assertEqual(result, 32)
+        with self.assertRaises(AdventOfCodeException):
+            day12(data_day12=EXAMPLE2_DAY12_PART1_DATA, part2=True, unfold_day12=0)
+        self.assertEqual(parse_unfold("3"), 3)
+        for value in ("0", "-1", "two"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_unfold(value)
+
+    def test_day12_stream_options(self):
+        for option in ({"jobs_day12": 2}, {"cache_day12": "cache.json"}):
+            with self.assertRaises(AdventOfCodeException):
+                day12(data_day12=EXAMPLE6_DAY12_PART1_DATA, stream_day12=True, **option)
+
 
 if __name__ == "__main__":
     unittest.main()
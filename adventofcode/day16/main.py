@@ -1,11 +1,14 @@
 import argparse
 import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 from logging import Logger
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
 
 from utils.error import AdventOfCodeException
+from utils.grid import Grid
 from utils.logger import MyLogger
 
 FILE_PATH = os.path.abspath(__file__)
@@ -24,6 +27,18 @@ def get_parser_day16() -> argparse.ArgumentParser:
     day16.add_argument(
         "--data-day16", type=Path, help="data to decode", default=DEFAULT_DAY16_DATA
     )
+    day16.add_argument(
+        "--engine-day16",
+        choices=ENGINES,
+        help="implementation of the beam propagation"
+        " (default: bitset for part 1, component for part 2)",
+    )
+    day16.add_argument(
+        "--jobs-day16",
+        type=int,
+        help="number of processes of the parallel engine (default: all the CPUs)",
+        default=0,
+    )
     return parser
 
 
@@ -42,13 +57,6 @@ South = Direction.South
 East = Direction.East
 West = Direction.West
 
-VECTOR: Dict[Direction, Position] = {
-    North: (-1, 0),
-    South: (1, 0),
-    East: (0, 1),
-    West: (0, -1),
-}
-
 NEXT_DIRECTIONS: Dict[str, Dict[Direction, List[Direction]]] = {
     ".": {
         North: [North],
@@ -82,110 +90,359 @@ NEXT_DIRECTIONS: Dict[str, Dict[Direction, List[Direction]]] = {
     },
 }
 
+# For each direction value, the tiles a beam crosses without turning
+PASSING: List[FrozenSet[int]] = [
+    frozenset(
+        ord(tile)
+        for tile, nexts in NEXT_DIRECTIONS.items()
+        if nexts[direct] == [direct]
+    )
+    for direct in Direction
+]
 
-class Cell:
-    def __init__(self, value: str) -> None:
-        self._value = value
-        self.energize: List[bool] = [False, False, False, False]
-
-    def energize_cell(self, direct: Direction) -> bool:
-        """return True if the position is already energize"""
-        if self.energize[direct.value]:
-            return False
-        self.energize[direct.value] = True
-        return True
-
-    def is_energize(self, reset: bool = False) -> bool:
-        res = any(self.energize)
-        if reset:
-            self.energize = [False, False, False, False]
-        return res
-
-    def beam(self) -> str:
-        if self._value != ".":
-            return self._value
-        if not any(self.energize):
-            return "."
-        if any(self.energize[2:]) and any(self.energize[:2]):
-            return "2"
-        if self.energize[South.value]:
-            return "v"
-        if self.energize[North.value]:
-            return "^"
-        if self.energize[West.value]:
-            return ">"
-        else:
-            return "<"
 
-    @property
-    def value(self) -> str:
-        return self._value
+Beam = Tuple[Position, Direction]
 
 
-class Contraption:
-    def __init__(self) -> None:
-        self.grid: List[List[Cell]] = []
-
-    def processs(self, part2: bool = False) -> int:
-        if part2:
-            res: List[int] = []
-            for i in range(0, len(self.grid)):
-                res.append(self.energizes_title([((i, 0), East)]))
-                res.append(self.energizes_title([((i, len(self.grid[0]) - 1), West)]))
-            for j in range(0, len(self.grid[0])):
-                res.append(self.energizes_title([((0, j), South)]))
-                res.append(self.energizes_title([((len(self.grid) - 1, j), North)]))
-            return max(res)
-        else:
-            return self.energizes_title([((0, 0), East)])
-
-    def energizes_title(self, cells: List[Tuple[Position, Direction]]) -> int:
-        for pos, direct in cells:
-            self.get_cell(pos).energize_cell(direct)
-        while cells:
-            cells = [
-                (n_pos, n_dir)
-                for pos, direct in cells
-                for n_pos, n_dir in self.next_move(pos, direct)
-                if not (
-                    n_pos[0] < 0
-                    or n_pos[1] < 0
-                    or n_pos[0] >= len(self.grid)
-                    or n_pos[1] >= len(self.grid[0])
+class Segment:
+    """The cells crossed by a beam until it is reflected or split"""
+
+    # Part 2 creates a segment for each mirror/splitter side: no __dict__
+    __slots__ = ("cells", "next_beams", "next_segments")
+
+    def __init__(self, cells: range, next_beams: List[Tuple[int, Direction]]):
+        # Cells and beams are stored with the flat indices of the grid, the
+        # cells of a straight line are a range of indices
+        self.cells = cells
+        self.next_beams = next_beams
+        self.next_segments: List["Segment"] = []
+
+
+class BitsetEngine:
+    """
+    Beam propagation on the flat bytearray of the grid.
+
+    The grid is padded with a border of 0 so that a beam leaving the
+    contraption needs no bounds check. A beam is packed into an int:
+    index * 4 + direction, and 'transitions' gives for each tile/direction
+    the deltas to add to a beam to get the next ones. The directions already
+    followed in a cell are the bits of a reusable flag plane, cleared at once
+    between two floods.
+    """
+
+    def __init__(self, grid: Grid) -> None:
+        self.grid = grid
+        self.cells = grid.cells
+        self.visited = grid.plane("energized")
+        # The offsets of the grid are in the order of the directions
+        step = grid.offsets()
+        # transitions[tile * 4 + direction] = deltas of the next beams
+        self.transitions: List[Tuple[int, ...]] = [()] * (128 * 4)
+        for tile, next_directions in NEXT_DIRECTIONS.items():
+            for direct in Direction:
+                self.transitions[ord(tile) << 2 | direct.value] = tuple(
+                    step[n_dir.value] * 4 + n_dir.value - direct.value
+                    for n_dir in next_directions[direct]
                 )
-                if self.get_cell(n_pos).energize_cell(n_dir)
+
+    def energizes(self, pos: Position, direct: Direction) -> int:
+        """Return the number of cells energized by a beam entering at 'pos'"""
+        cells, visited, transitions = self.cells, self.visited, self.transitions
+        self.grid.clear("energized")
+        beams = [self.grid.index(*pos) * 4 + direct.value]
+        while beams:
+            beam = beams.pop()
+            index = beam >> 2
+            tile = cells[index]
+            if not tile:
+                continue
+            bit = 1 << (beam & 3)
+            if visited[index] & bit:
+                continue
+            visited[index] |= bit
+            for delta in transitions[tile << 2 | beam & 3]:
+                beams.append(beam + delta)
+        return len(visited) - visited.count(0)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The grid is sent to a worker without its planes: it has its own state
+        return {"grid": self.grid, "transitions": self.transitions}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.cells = self.grid.cells
+        self.visited = self.grid.plane("energized")
+
+
+# Implementations of the beam propagation:
+# - bitset: BitsetEngine, one flood per entry
+# - segment: jump from a segment of cells to the next ones, shared by entries
+# - component: energized cells computed once per strongly connected component
+#   of the segments graph, shared by entries
+# - parallel: bitset floods of the entries dispatched to a pool of processes
+ENGINES = ("bitset", "segment", "component", "parallel")
+
+
+# BitsetEngine of a worker process of Contraption.energizes_parallel
+worker_engine: Optional[BitsetEngine] = None
+
+
+def init_worker(engine: BitsetEngine) -> None:
+    global worker_engine
+    worker_engine = engine
+
+
+def energizes_entries(beams: List[Beam]) -> int:
+    """Return the highest number of cells energized by one of the beams"""
+    if worker_engine is None:
+        raise AdventOfCodeException("The worker engine is not initialized")
+    return max(worker_engine.energizes(pos, direct) for pos, direct in beams)
+
+
+class Contraption:
+    def __init__(self, grid: Grid) -> None:
+        self.grid = grid
+        # Keyed by index << 2 | direction: int keys hash faster than enums
+        self.segments: Dict[int, Segment] = {}
+        self.engine = BitsetEngine(grid)
+
+    def processs(
+        self, part2: bool = False, engine: str = "bitset", jobs: int = 0
+    ) -> int:
+        if engine not in ENGINES:
+            raise AdventOfCodeException(f"Unknown engine: {engine}")
+        entries = self.get_entries() if part2 else [((0, 0), East)]
+        if engine == "bitset":
+            return max(self.engine.energizes(pos, direct) for pos, direct in entries)
+        if engine == "parallel":
+            return self.energizes_parallel(entries, jobs or os.cpu_count() or 1)
+        if engine == "segment":
+            return max(self.energizes_segments(beam) for beam in entries)
+        return max(self.energizes_components(entries))
+
+    def energizes_parallel(self, beams: List[Beam], jobs: int) -> int:
+        """
+        Return the highest number of cells energized by one of the beams.
+
+        The beams are split into chunks flooded by a pool of processes, each
+        of them with its own copy of the bitset engine.
+        """
+        count = min(jobs * 4, len(beams))
+        chunks = [beams[i::count] for i in range(count)]
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_worker, initargs=(self.engine,)
+        ) as executor:
+            return max(executor.map(energizes_entries, chunks))
+
+    def get_entries(self) -> List[Beam]:
+        """Beams entering the contraption from each edge cell"""
+        rows, cols = self.grid.rows, self.grid.cols
+        entries: List[Beam] = []
+        for i in range(0, rows):
+            entries.append(((i, 0), East))
+            entries.append(((i, cols - 1), West))
+        for j in range(0, cols):
+            entries.append(((0, j), South))
+            entries.append(((rows - 1, j), North))
+        return entries
+
+    def get_segment(self, index: int, direct: Direction) -> Segment:
+        """
+        Follow a beam in a straight line until it leaves the grid or meets a
+        mirror/splitter which changes its direction.
+
+        Segments are stored: they are shared by all the beams of part 2.
+        """
+        key, step = index << 2 | direct.value, self.grid.offsets()
+        if key not in self.segments:
+            cells, start, delta = self.grid.cells, index, step[direct.value]
+            passing = PASSING[direct.value]
+            while cells[index] in passing:
+                if not cells[index + delta]:
+                    next_directions = []
+                    break
+                index += delta
+            else:
+                next_directions = NEXT_DIRECTIONS[chr(cells[index])][direct]
+            self.segments[key] = Segment(
+                range(start, index + delta, delta),
+                [
+                    (index + step[n_dir.value], n_dir)
+                    for n_dir in next_directions
+                    if cells[index + step[n_dir.value]]
+                ],
+            )
+        return self.segments[key]
+
+    def get_next_segments(self, segment: Segment) -> List[Segment]:
+        if len(segment.next_segments) != len(segment.next_beams):
+            segment.next_segments = [
+                self.get_segment(*beam) for beam in segment.next_beams
             ]
-        return sum([cell.is_energize(reset=True) for row in self.grid for cell in row])
+        return segment.next_segments
+
+    def get_entry_segment(self, beam: Beam) -> Segment:
+        pos, direct = beam
+        return self.get_segment(self.grid.index(*pos), direct)
+
+    def energizes_segments(self, beam: Beam) -> int:
+        """Same as BitsetEngine.energizes but jumping from a segment to the next one"""
+        energized: Set[int] = set()
+        segment = self.get_entry_segment(beam)
+        seen: Set[Segment] = {segment}
+        segments: List[Segment] = [segment]
+        while segments:
+            segment = segments.pop()
+            energized.update(segment.cells)
+            for next_segment in self.get_next_segments(segment):
+                if next_segment not in seen:
+                    seen.add(next_segment)
+                    segments.append(next_segment)
+        return len(energized)
+
+    def energizes_components(self, beams: List[Beam]) -> List[int]:
+        """
+        Same as energizes_segments for many beams at once.
+
+        The segments graph is condensed into its strongly connected components
+        (Tarjan's algorithm): all the segments of a component energize the
+        same cells. Most beams end up in the largest component, its energized
+        cells are flagged once in a plane of the grid. Each beam is then only
+        followed until it reaches the largest component, and the cells it
+        energized on the way which are not flagged are added to the count of
+        the largest component. The memory is the segments graph and one
+        plane, whatever the number of beams.
+        """
+        entries = [self.get_entry_segment(beam) for beam in beams]
+        component = self.condense(entries)
+        sizes = Counter(component.values())
+        largest = max(sizes, key=sizes.__getitem__)
+        core = [segment for segment in component if component[segment] == largest]
+        closure = self.grid.plane("closure")
+        self.grid.clear("closure")
+        core_count = self.flood(core, closure)
+
+        counts: Dict[Segment, int] = {}
+        for entry in entries:
+            if entry in counts:
+                continue
+            energized: Set[int] = set()
+            seen: Set[Segment] = {entry}
+            segments: List[Segment] = [entry]
+            reached = False
+            while segments:
+                segment = segments.pop()
+                if component[segment] == largest:
+                    reached = True
+                    continue
+                energized.update(segment.cells)
+                for next_segment in segment.next_segments:
+                    if next_segment not in seen:
+                        seen.add(next_segment)
+                        segments.append(next_segment)
+            if reached:
+                counts[entry] = core_count + sum(
+                    1 for cell in energized if not closure[cell]
+                )
+            else:
+                counts[entry] = len(energized)
+        return [counts[entry] for entry in entries]
+
+    def flood(self, segments: List[Segment], plane: bytearray) -> int:
+        """Flag in 'plane' the cells energized from 'segments' and count them"""
+        seen: Set[Segment] = set(segments)
+        segments = list(segments)
+        count = 0
+        while segments:
+            segment = segments.pop()
+            for cell in segment.cells:
+                if not plane[cell]:
+                    plane[cell] = 1
+                    count += 1
+            for next_segment in segment.next_segments:
+                if next_segment not in seen:
+                    seen.add(next_segment)
+                    segments.append(next_segment)
+        return count
+
+    def condense(self, entries: List[Segment]) -> Dict[Segment, int]:
+        """
+        Return the strongly connected component of each segment reached from
+        'entries' (iterative Tarjan's algorithm).
+        """
+        index: Dict[Segment, int] = {}
+        low: Dict[Segment, int] = {}
+        component: Dict[Segment, int] = {}
+        stack: List[Segment] = []
+        for root in entries:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            work = [(root, iter(self.get_next_segments(root)))]
+            while work:
+                segment, next_segments = work[-1]
+                for next_segment in next_segments:
+                    if next_segment not in index:
+                        index[next_segment] = low[next_segment] = len(index)
+                        stack.append(next_segment)
+                        work.append(
+                            (next_segment, iter(self.get_next_segments(next_segment)))
+                        )
+                        break
+                    if next_segment not in component:
+                        # Still on the stack: in the component being explored
+                        low[segment] = min(low[segment], index[next_segment])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[segment])
+                    if low[segment] == index[segment]:
+                        # Pop the component: its identifier is its root
+                        current = index[segment]
+                        while True:
+                            member = stack.pop()
+                            component[member] = current
+                            del low[member]
+                            if member is segment:
+                                break
+        return component
 
     def print(self):
+        """Print the cells energized by the last flood of the bitset engine"""
         logger.info("")
-        for cells in self.grid:
-            logger.info("".join(["#" if cell.is_energize() else "." for cell in cells]))
+        for row in range(self.grid.rows):
+            logger.info(
+                "".join(
+                    "#" if self.engine.visited[index] else "."
+                    for index in self.grid.row_indices(row)
+                )
+            )
 
     def print_beam(self):
         logger.info("")
-        for cells in self.grid:
-            logger.info("".join([cell.beam() for cell in cells]))
-
-    def next_move(
-        self, pos: Position, direction: Direction
-    ) -> List[Tuple[Position, Direction]]:
-        return [
-            (tuple(map(sum, zip(pos, VECTOR[n_dir]))), n_dir)
-            for n_dir in NEXT_DIRECTIONS[self.get_value(pos)][direction]
-        ]
-
-    def get_value(self, pos: Position) -> str:
-        return self.get_cell(pos).value
-
-    def get_cell(self, pos: Position) -> Cell:
-        try:
-            return self.grid[pos[0]][pos[1]]
-        except IndexError:
-            raise AdventOfCodeException(f"Undefined position: {pos}")
-
-    def add_line(self, line: str) -> None:
-        self.grid.append([Cell(li) for li in line])
+        for row in range(self.grid.rows):
+            logger.info(
+                "".join(self.get_beam(index) for index in self.grid.row_indices(row))
+            )
+
+    def get_beam(self, index: int) -> str:
+        value, energize = chr(self.grid.cells[index]), self.engine.visited[index]
+        if value != ".":
+            return value
+        if not energize:
+            return "."
+        if energize & 0b1100 and energize & 0b0011:
+            return "2"
+        if energize & 1 << South.value:
+            return "v"
+        if energize & 1 << North.value:
+            return "^"
+        if energize & 1 << West.value:
+            return ">"
+        else:
+            return "<"
 
 
 def day16(part2: bool = False, **kwargs) -> int:
@@ -201,7 +458,9 @@ def day16(part2: bool = False, **kwargs) -> int:
         raise AdventOfCodeException("Undefined parameter 'data_day16'")
 
     contraption: Contraption = parse_data(kwargs["data_day16"])
-    result = contraption.processs(part2)
+    # A flood per entry is faster with bitsets, part 2 shares the components
+    engine = kwargs.get("engine_day16") or ("component" if part2 else "bitset")
+    result = contraption.processs(part2, engine, kwargs.get("jobs_day16", 0))
     # Print the result
     logger.info("The solution of day16 PART%d is: %d", 2 if part2 else 1, result)
     return result
@@ -209,8 +468,6 @@ def day16(part2: bool = False, **kwargs) -> int:
 
 def parse_data(data_path: Path) -> Contraption:
     """Read Each Line and parse the content"""
-    contraption: Contraption = Contraption()
     with open(data_path, "r") as f:
-        for line in f:
-            contraption.add_line(line.strip())
-    return contraption
+        lines = [line.strip() for line in f if line.strip()]
+    return Contraption(Grid.from_lines(lines))
@@ -1,10 +1,23 @@
 import os
+import tempfile
+import time
+import tracemalloc
 import unittest
 
-from ..main import day16
+from utils.generator import write_input
+
+from ..main import ENGINES, East, day16, parse_data
 
 FILE_PATH = os.path.abspath(__file__)
 EXAMPLE_DAY16 = os.path.dirname(FILE_PATH) + "/../data/example.txt"
+DATA_DAY16 = os.path.dirname(FILE_PATH) + "/../data/input.txt"
+# Maximum CPU time (in seconds) to solve both parts of the puzzle input
+TIME_BUDGET = 1.0
+# Maximum memory (in bytes per cell) allocated to solve a generated grid:
+# part 1 floods the bytearray grid (~4 bytes per cell, ~100MB for 5000x5000),
+# the segments graph of part 2 takes ~110 bytes per cell (~412MB of peak RSS
+# for 2000x2000), so the component engine does not fit 5000x5000 in tens of MB
+MEMORY_BUDGET = {False: 8, True: 160}
 
 
 class TestDay16(unittest.TestCase):
@@ -16,6 +29,63 @@ class TestDay16(unittest.TestCase):
         result = day16(data_day16=EXAMPLE_DAY16, part2=True)
         self.assertEqual(result, 51)
 
+    def test_day16_engines(self):
+        for engine in ENGINES:
+            result = day16(data_day16=EXAMPLE_DAY16, engine_day16=engine)
+            self.assertEqual(result, 46)
+            result = day16(data_day16=EXAMPLE_DAY16, part2=True, engine_day16=engine)
+            self.assertEqual(result, 51)
+
+    def test_day16_bitset_reset(self):
+        contraption = parse_data(EXAMPLE_DAY16)
+        contraption.processs(part2=True, engine="bitset")
+        # The visited directions of the previous floods are cleared
+        self.assertEqual(contraption.engine.energizes((0, 0), East), 46)
+
+    def test_day16_components(self):
+        contraption = parse_data(EXAMPLE_DAY16)
+        entries = contraption.get_entries()
+        self.assertEqual(
+            contraption.energizes_components(entries),
+            [contraption.energizes_segments(beam) for beam in entries],
+        )
+
+    def test_day16_components_generated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_input(16, os.path.join(directory, "day16.txt"), 30, seed=3)
+            contraption = parse_data(path)
+        # The same entry twice shares its component
+        entries = contraption.get_entries()
+        entries.append(entries[0])
+        self.assertEqual(
+            contraption.energizes_components(entries),
+            [contraption.engine.energizes(*beam) for beam in entries],
+        )
+
+    def test_day16_memory_budget(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_input(16, os.path.join(directory, "day16.txt"), 200, seed=3)
+            for part2, budget in MEMORY_BUDGET.items():
+                tracemalloc.start()
+                try:
+                    day16(data_day16=path, part2=part2)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                self.assertLess(peak, budget * 200 * 200)
+
+    def test_day16_parallel(self):
+        result = day16(
+            data_day16=EXAMPLE_DAY16, part2=True, engine_day16="parallel", jobs_day16=2
+        )
+        self.assertEqual(result, 51)
+
+    def test_day16_time_budget(self):
+        start = time.process_time()
+        self.assertEqual(day16(data_day16=DATA_DAY16), 7798)
+        self.assertEqual(day16(data_day16=DATA_DAY16, part2=True), 8026)
+        self.assertLess(time.process_time() - start, TIME_BUDGET)
+
 
 if __name__ == "__main__":
     unittest.main()
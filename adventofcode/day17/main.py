@@ -1,10 +1,10 @@
 import argparse
 import os
-from collections import defaultdict
+from array import array
 from heapq import heappop, heappush
 from logging import Logger
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple, Type
 
 from utils.error import AdventOfCodeException
 from utils.logger import MyLogger
@@ -25,159 +25,418 @@ def get_parser_day17() -> argparse.ArgumentParser:
     day17.add_argument(
         "--data-day17", type=Path, help="data to decode", default=DEFAULT_DAY17_DATA
     )
+    day17.add_argument(
+        "--solver-day17",
+        choices=SOLVERS.keys(),
+        help="implementation of the shortest path search",
+        default="packed",
+    )
+    day17.add_argument(
+        "--queue-day17",
+        choices=QUEUES,
+        help="priority queue of the packed solver (bucket: Dial's algorithm)",
+        default="bucket",
+    )
+    day17.add_argument(
+        "--heuristic-day17",
+        choices=HEURISTICS,
+        help="lower bound used to turn the packed solver into A*",
+        default="none",
+    )
+    day17.add_argument(
+        "--routes-day17",
+        type=parse_route,
+        nargs="+",
+        metavar="ROW,COL:ROW,COL:MIN-MAX",
+        help="additional routes to find on the grid e.g. 0,0:12,12:4-10",
+        default=[],
+    )
     return parser
 
 
+def parse_route(value: str) -> "Query":
+    """Parse 'row,col:row,col:min-max' into (source, target, min_run, max_run)"""
+    try:
+        source, target, runs = value.split(":")
+        (i1, j1), (i2, j2) = (map(int, p.split(",")) for p in (source, target))
+        min_run, max_run = map(int, runs.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid route: '{value}'")
+    return (i1, j1), (i2, j2), min_run, max_run
+
+
+Position = Tuple[int, int]
+# Distance of the nodes not reached yet
+UNREACHED = 2**62
+# A node is a position with the axis of the last move: the next move must be
+# on the other axis (0: horizontal, 1: vertical)
+Node = Tuple[int, int, int]
+# Route from a source to a target with the minimum and maximum number of blocks
+# the crucible could move before turning
+Query = Tuple[Position, Position, int, int]
+
+
 class DijkstraSolver:
     def __init__(self) -> None:
         self.grid: List[List[int]] = []
-        self.graph = defaultdict(list)
-
-    def make_graph(self, part2: bool = False) -> None:
-        for i in range(len(self.grid)):
-            for j in range(len(self.grid[0])):
-                for k in range(4, 11) if part2 else range(1, 4):
-                    if j - k >= 0:
-                        self.graph[self.gid(i, j, "N")].append(
-                            (
-                                sum(self.grid[i][j - m] for m in range(1, k + 1)),
-                                self.gid(i, j - k, "E"),
-                            )
-                        )
-                        self.graph[self.gid(i, j, "N")].append(
-                            (
-                                sum(self.grid[i][j - m] for m in range(1, k + 1)),
-                                self.gid(i, j - k, "W"),
-                            )
-                        )
-                        if i != 0 or j != 0:
-                            self.graph[self.gid(i, j, "S")].append(
-                                (
-                                    sum(self.grid[i][j - m] for m in range(1, k + 1)),
-                                    self.gid(i, j - k, "E"),
-                                )
-                            )
-                            self.graph[self.gid(i, j, "S")].append(
-                                (
-                                    sum(self.grid[i][j - m] for m in range(1, k + 1)),
-                                    self.gid(i, j - k, "W"),
-                                )
-                            )
-                    if j + k < len(self.grid[0]):
-                        self.graph[self.gid(i, j, "N")].append(
-                            (
-                                sum(self.grid[i][j + m] for m in range(1, k + 1)),
-                                self.gid(i, j + k, "E"),
-                            )
-                        )
-                        self.graph[self.gid(i, j, "N")].append(
-                            (
-                                sum(self.grid[i][j + m] for m in range(1, k + 1)),
-                                self.gid(i, j + k, "W"),
-                            )
-                        )
-                        if i != 0 or j != 0:
-                            self.graph[self.gid(i, j, "S")].append(
-                                (
-                                    sum(self.grid[i][j + m] for m in range(1, k + 1)),
-                                    self.gid(i, j + k, "E"),
-                                )
-                            )
-                            self.graph[self.gid(i, j, "S")].append(
-                                (
-                                    sum(self.grid[i][j + m] for m in range(1, k + 1)),
-                                    self.gid(i, j + k, "W"),
-                                )
-                            )
-                    if i - k >= 0:
-                        self.graph[self.gid(i, j, "E")].append(
-                            (
-                                sum(self.grid[i - m][j] for m in range(1, k + 1)),
-                                self.gid(i - k, j, "N"),
-                            )
-                        )
-                        self.graph[self.gid(i, j, "E")].append(
-                            (
-                                sum(self.grid[i - m][j] for m in range(1, k + 1)),
-                                self.gid(i - k, j, "S"),
-                            )
-                        )
-                        if i != 0 or j != 0:
-                            self.graph[self.gid(i, j, "W")].append(
-                                (
-                                    sum(self.grid[i - m][j] for m in range(1, k + 1)),
-                                    self.gid(i - k, j, "N"),
-                                )
-                            )
-                            self.graph[self.gid(i, j, "W")].append(
-                                (
-                                    sum(self.grid[i - m][j] for m in range(1, k + 1)),
-                                    self.gid(i - k, j, "S"),
-                                )
-                            )
-                    if i + k < len(self.grid):
-                        self.graph[self.gid(i, j, "E")].append(
-                            (
-                                sum(self.grid[i + m][j] for m in range(1, k + 1)),
-                                self.gid(i + k, j, "N"),
-                            )
-                        )
-                        self.graph[self.gid(i, j, "E")].append(
-                            (
-                                sum(self.grid[i + m][j] for m in range(1, k + 1)),
-                                self.gid(i + k, j, "S"),
-                            )
-                        )
-                        if i != 0 or j != 0:
-                            self.graph[self.gid(i, j, "W")].append(
-                                (
-                                    sum(self.grid[i + m][j] for m in range(1, k + 1)),
-                                    self.gid(i + k, j, "N"),
-                                )
-                            )
-                            self.graph[self.gid(i, j, "W")].append(
-                                (
-                                    sum(self.grid[i + m][j] for m in range(1, k + 1)),
-                                    self.gid(i + k, j, "S"),
-                                )
-                            )
+        self.moves: range = range(1, 4)
+
+    def set_crucible(self, part2: bool = False) -> None:
+        """Number of blocks a crucible could move before turning"""
+        self.moves = range(4, 11) if part2 else range(1, 4)
 
     def find_shortest_path(self) -> int:
         """
-        source code from: https://gist.github.com/kachayev/5990802
+        Dijkstra algorithm, inspired by: https://gist.github.com/kachayev/5990802
+
+        The neighbors are computed on the fly instead of being stored into a
+        graph: the cost of the moves on an axis is accumulated block after
+        block.
         """
-        f = self.gid(0, 0)
-        t = self.gid(len(self.grid) - 1, len(self.grid[0]) - 1)
-        queue, seen, dist = [(0, f, ())], set(), {f: 0}
+        grid, (min_move, max_move) = self.grid, (self.moves.start, self.moves.stop)
+        rows, cols = len(grid), len(grid[0])
+        queue: List[Tuple[int, int, int, int]] = [(0, 0, 0, 0), (0, 0, 0, 1)]
+        dist: Dict[Node, int] = {(0, 0, 0): 0, (0, 0, 1): 0}
         while queue:
-            (cost, v1, path) = heappop(queue)
-            if v1 in seen:
+            cost, i, j, axis = heappop(queue)
+            if cost > dist[(i, j, axis)]:
                 continue
+            if i == rows - 1 and j == cols - 1:
+                return cost
 
-            seen.add(v1)
-            path += (v1,)
-            if v1 == t:
-                return (cost, path)
+            for sign in (-1, 1):
+                new_cost = cost
+                for k in range(1, max_move):
+                    row, col = (i, j + sign * k) if axis else (i + sign * k, j)
+                    if not (0 <= row < rows and 0 <= col < cols):
+                        break
+                    new_cost += grid[row][col]
+                    if k >= min_move:
+                        node = (row, col, 1 - axis)
+                        if node not in dist or new_cost < dist[node]:
+                            dist[node] = new_cost
+                            heappush(queue, (new_cost, row, col, 1 - axis))
 
-            for c, v2 in self.graph.get(v1, ()):
-                if v2 in seen:
+        return 0
+
+    def add_line(self, line: str) -> None:
+        self.grid.append([int(li) for li in line])
+
+
+# Priority queues of the packed solver:
+# - heap: binary heap, O(log n) per operation
+# - bucket: circular array of buckets indexed by cost (Dial's algorithm), O(1)
+#   per operation as the cost of an edge is a small bounded integer
+QUEUES = ("heap", "bucket")
+# Lower bounds of the heat loss from a block to the target, they turn the
+# packed solver into A*:
+# - none: plain Dijkstra
+# - manhattan: manhattan distance times the lowest heat loss of a block
+# - reverse: heat loss computed by a Dijkstra from the target on the grid
+#   without the crucible constraints
+HEURISTICS = ("none", "manhattan", "reverse")
+
+
+class PackedDijkstraSolver(DijkstraSolver):
+    """
+    Dijkstra algorithm on nodes packed into an int: (row * cols + col) * 2 + axis
+
+    The distances (and the predecessors if the path is requested) are stored
+    into flat arrays of 2 * rows * cols integers and the cost of a move is
+    read from the prefix sums of its row or column. The neighbors are
+    expanded on the fly so the memory stays bounded on large grids.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        # row_sums[row * (cols + 1) + col] = sum(grid[row][:col])
+        self.row_sums: array = array("q")
+        # col_sums[col * (rows + 1) + row] = sum(grid[:row][col])
+        self.col_sums: array = array("q")
+        self.heuristics: Dict[str, array] = {}
+        self.expanded = 0
+        # Searches of the routes by (source, min_run, max_run)
+        self.states: Dict[Tuple[int, int, int], SearchState] = {}
+
+    def compute_prefix_sums(self) -> None:
+        rows, cols = len(self.grid), len(self.grid[0])
+        self.row_sums = array("q", [0]) * (rows * (cols + 1))
+        self.col_sums = array("q", [0]) * (cols * (rows + 1))
+        for i, line in enumerate(self.grid):
+            for j, heat in enumerate(line):
+                self.row_sums[i * (cols + 1) + j + 1] = (
+                    self.row_sums[i * (cols + 1) + j] + heat
+                )
+                self.col_sums[j * (rows + 1) + i + 1] = (
+                    self.col_sums[j * (rows + 1) + i] + heat
+                )
+
+    def expand(self, cost: int, node: int, moves: range) -> List[Tuple[int, int]]:
+        """Return the (cost, node) reached by each move after 'node'"""
+        rows, cols = len(self.grid), len(self.grid[0])
+        min_move, max_move = moves.start, moves.stop - 1
+        row, col = divmod(node >> 1, cols)
+        if node & 1:
+            # The last move was vertical: move horizontally
+            sums, line, first = self.row_sums, row * (cols + 1), row * cols
+            after, before = cost - sums[line + col + 1], cost + sums[line + col]
+            return [
+                (after + sums[line + stop + 1], (first + stop) << 1)
+                for stop in range(col + min_move, min(col + max_move, cols - 1) + 1)
+            ] + [
+                (before - sums[line + stop], (first + stop) << 1)
+                for stop in range(col - min_move, max(col - max_move, 0) - 1, -1)
+            ]
+        sums, line = self.col_sums, col * (rows + 1)
+        after, before = cost - sums[line + row + 1], cost + sums[line + row]
+        return [
+            (after + sums[line + stop + 1], (stop * cols + col) << 1 | 1)
+            for stop in range(row + min_move, min(row + max_move, rows - 1) + 1)
+        ] + [
+            (before - sums[line + stop], (stop * cols + col) << 1 | 1)
+            for stop in range(row - min_move, max(row - max_move, 0) - 1, -1)
+        ]
+
+    def get_heuristic(self, heuristic: str) -> array:
+        """Return the lower bound of the heat loss from each block to the target"""
+        if heuristic not in self.heuristics:
+            rows, cols = len(self.grid), len(self.grid[0])
+            if heuristic == "none":
+                bounds = array("q", [0]) * (rows * cols)
+            elif heuristic == "manhattan":
+                lowest = min(map(min, self.grid))
+                bounds = array(
+                    "q",
+                    (
+                        (rows - 1 - row + cols - 1 - col) * lowest
+                        for row in range(rows)
+                        for col in range(cols)
+                    ),
+                )
+            elif heuristic == "reverse":
+                bounds = self.reverse_dijkstra()
+            else:
+                raise AdventOfCodeException(f"Unknown heuristic: {heuristic}")
+            self.heuristics[heuristic] = bounds
+        return self.heuristics[heuristic]
+
+    def reverse_dijkstra(self) -> array:
+        """
+        Heat loss from each block to the target without the crucible
+        constraints (one block at a time in any direction).
+        """
+        rows, cols = len(self.grid), len(self.grid[0])
+        target = rows * cols - 1
+        bounds = array("q", [UNREACHED]) * (rows * cols)
+        bounds[target] = 0
+        queue: List[Tuple[int, int]] = [(0, target)]
+        while queue:
+            cost, index = heappop(queue)
+            if cost > bounds[index]:
+                continue
+            row, col = divmod(index, cols)
+            # Going from a neighbor to this block costs the heat loss of the block
+            new_cost = cost + self.grid[row][col]
+            for n_row, n_col in (
+                (row - 1, col),
+                (row + 1, col),
+                (row, col - 1),
+                (row, col + 1),
+            ):
+                if 0 <= n_row < rows and 0 <= n_col < cols:
+                    n_index = n_row * cols + n_col
+                    if new_cost < bounds[n_index]:
+                        bounds[n_index] = new_cost
+                        heappush(queue, (new_cost, n_index))
+        return bounds
+
+    def search(
+        self, track: bool = False, queue_type: str = "heap", heuristic: str = "none"
+    ) -> Tuple[int, int, Optional[array]]:
+        """
+        Return the heat loss, the target node and the predecessors array
+        (only if 'track' is True, -1 for the start nodes)
+
+        'queue_type' selects the priority queue (see QUEUES) and 'heuristic'
+        turns Dijkstra into A* (see HEURISTICS). The number of expanded nodes
+        is stored into 'expanded'.
+        """
+        if queue_type not in QUEUES:
+            raise AdventOfCodeException(f"Unknown priority queue: {queue_type}")
+        if len(self.row_sums) == 0:
+            self.compute_prefix_sums()
+        bounds = self.get_heuristic(heuristic)
+        nodes = 2 * len(self.grid) * len(self.grid[0])
+        dist = array("q", [UNREACHED]) * nodes
+        pred = array("q", [-1]) * nodes if track else None
+        dist[0] = dist[1] = 0
+        if queue_type == "bucket":
+            cost, node = self.search_buckets(dist, pred, bounds)
+        else:
+            cost, node = self.search_heap(dist, pred, bounds)
+        return cost, node, pred
+
+    def search_heap(
+        self, dist: array, pred: Optional[array], bounds: array
+    ) -> Tuple[int, int]:
+        target = len(self.grid) * len(self.grid[0]) - 1
+        # The priority of a node is its cost plus the lower bound to the target
+        queue: List[Tuple[int, int]] = [(bounds[0], 0), (bounds[0], 1)]
+        expanded = 0
+        while queue:
+            priority, node = heappop(queue)
+            cost = priority - bounds[node >> 1]
+            if cost > dist[node]:
+                continue
+            expanded += 1
+            if node >> 1 == target:
+                self.expanded = expanded
+                return cost, node
+
+            for new_cost, new_node in self.expand(cost, node, self.moves):
+                if new_cost < dist[new_node]:
+                    dist[new_node] = new_cost
+                    if pred is not None:
+                        pred[new_node] = node
+                    heappush(queue, (new_cost + bounds[new_node >> 1], new_node))
+        self.expanded = expanded
+        return 0, -1
+
+    def search_buckets(
+        self, dist: array, pred: Optional[array], bounds: array
+    ) -> Tuple[int, int]:
+        target = len(self.grid) * len(self.grid[0]) - 1
+        # A move costs at most max_move blocks of the highest heat loss and
+        # changes the (consistent) lower bound by at most as much, so the
+        # queued priorities are always in [priority ; priority + 2 * max_edge]
+        max_edge = max(map(max, self.grid)) * (self.moves.stop - 1)
+        buckets: List[List[int]] = [[] for _ in range(2 * max_edge + 1)]
+        priority, size = bounds[0], 2
+        buckets[priority % len(buckets)].extend((0, 1))
+        expanded = 0
+        while size:
+            bucket = buckets[priority % len(buckets)]
+            while bucket:
+                node = bucket.pop()
+                size -= 1
+                cost = priority - bounds[node >> 1]
+                if cost > dist[node]:
                     continue
+                expanded += 1
+                if node >> 1 == target:
+                    self.expanded = expanded
+                    return cost, node
 
-                if v2 not in dist or cost + c < dist[v2]:
-                    dist[v2] = cost + c
-                    heappush(queue, (cost + c, v2, path))
+                for new_cost, new_node in self.expand(cost, node, self.moves):
+                    if new_cost < dist[new_node]:
+                        dist[new_node] = new_cost
+                        if pred is not None:
+                            pred[new_node] = node
+                        new_priority = new_cost + bounds[new_node >> 1]
+                        buckets[new_priority % len(buckets)].append(new_node)
+                        size += 1
+            priority += 1
+        self.expanded = expanded
+        return 0, -1
 
-        return 0, []
+    def compare_heuristics(self, queue_type: str = "heap") -> Dict[str, int]:
+        """Return the number of nodes expanded with each heuristic"""
+        expanded: Dict[str, int] = {}
+        for heuristic in HEURISTICS:
+            self.search(queue_type=queue_type, heuristic=heuristic)
+            expanded[heuristic] = self.expanded
+        return expanded
 
-    def gid(self, i: int, j: int, val: str = "") -> int:
-        if (i == 0 and j == 0) or (
-            i == len(self.grid) - 1 and j == len(self.grid[0]) - 1
-        ):
-            return f"{i}:{j}"
-        return f"{i}{val}{j}"
+    def find_shortest_path(
+        self, queue_type: str = "heap", heuristic: str = "none"
+    ) -> int:
+        return self.search(queue_type=queue_type, heuristic=heuristic)[0]
 
-    def add_line(self, line: str) -> None:
-        self.grid.append([int(li) for li in line])
+    def find_path(
+        self, queue_type: str = "heap", heuristic: str = "none"
+    ) -> Tuple[int, List[Position]]:
+        """Return the heat loss and the blocks where the crucible turns"""
+        cost, node, pred = self.search(
+            track=True, queue_type=queue_type, heuristic=heuristic
+        )
+        path: List[Position] = []
+        while node >= 0:
+            path.append(divmod(node >> 1, len(self.grid[0])))
+            node = pred[node]
+        return cost, path[::-1]
+
+    def route(
+        self, source: Position, target: Position, min_run: int = 1, max_run: int = 3
+    ) -> Optional[int]:
+        """
+        Return the heat loss from 'source' to 'target' of a crucible moving
+        between 'min_run' and 'max_run' blocks before turning (None if the
+        target can't be reached)
+
+        The search of each (source, min_run, max_run) is kept and resumed by
+        the next queries.
+        """
+        rows, cols = len(self.grid), len(self.grid[0])
+        for row, col in (source, target):
+            if not (0 <= row < rows and 0 <= col < cols):
+                raise AdventOfCodeException(f"Position out of the grid: {(row, col)}")
+        if not 1 <= min_run <= max_run:
+            raise AdventOfCodeException(f"Invalid run lengths: {min_run}-{max_run}")
+        if len(self.row_sums) == 0:
+            self.compute_prefix_sums()
+        key = (source[0] * cols + source[1], min_run, max_run)
+        if key not in self.states:
+            self.states[key] = SearchState(self, key[0], range(min_run, max_run + 1))
+        return self.states[key].distance(target[0] * cols + target[1])
+
+    def routes(self, queries: Iterable[Query]) -> List[Optional[int]]:
+        """Answer a batch of (source, target, min_run, max_run) queries"""
+        return [self.route(*query) for query in queries]
+
+
+class SearchState:
+    """
+    Dijkstra search from a source block which is resumed on demand: a target
+    already settled is answered at once, otherwise the search continues until
+    the target is settled.
+
+    A heuristic depends on the target so the search is not an A*.
+    """
+
+    def __init__(self, solver: PackedDijkstraSolver, source: int, moves: range):
+        self.solver = solver
+        self.moves = moves
+        nodes = 2 * len(solver.grid) * len(solver.grid[0])
+        self.dist = array("q", [UNREACHED]) * nodes
+        self.settled = bytearray(nodes)
+        self.dist[source << 1] = self.dist[source << 1 | 1] = 0
+        self.queue: List[Tuple[int, int]] = [(0, source << 1), (0, source << 1 | 1)]
+        self.expanded = 0
+
+    def distance(self, target: int) -> Optional[int]:
+        """Return the heat loss from the source to the 'target' block"""
+        dist, settled, queue = self.dist, self.settled, self.queue
+        first, second = target << 1, target << 1 | 1
+        while queue and not (settled[first] or settled[second]):
+            cost, node = heappop(queue)
+            if settled[node]:
+                continue
+            settled[node] = 1
+            self.expanded += 1
+            for new_cost, new_node in self.solver.expand(cost, node, self.moves):
+                if new_cost < dist[new_node]:
+                    dist[new_node] = new_cost
+                    heappush(queue, (new_cost, new_node))
+        if not (settled[first] or settled[second]):
+            return None
+        # The node of the other axis (if not settled) can't be any closer
+        return min(dist[first], dist[second])
+
+
+SOLVERS: Dict[str, Type[DijkstraSolver]] = {
+    "tuple": DijkstraSolver,
+    "packed": PackedDijkstraSolver,
+}
 
 
 def day17(part2: bool = False, **kwargs) -> int:
@@ -192,18 +451,38 @@ def day17(part2: bool = False, **kwargs) -> int:
     if "data_day17" not in kwargs:
         raise AdventOfCodeException("Undefined parameter 'data_day17'")
 
-    solver: DijkstraSolver = parse_data(kwargs["data_day17"], part2)
-    result = solver.find_shortest_path()[0]
+    solver: DijkstraSolver = parse_data(
+        kwargs["data_day17"], part2, SOLVERS[kwargs.get("solver_day17", "packed")]
+    )
+    if isinstance(solver, PackedDijkstraSolver):
+        queue_type = kwargs.get("queue_day17", "bucket")
+        heuristic = kwargs.get("heuristic_day17", "none")
+        result = solver.find_shortest_path(queue_type, heuristic)
+        if heuristic != "none":
+            logger.info("A* (%s) expanded %d nodes", heuristic, solver.expanded)
+    else:
+        result = solver.find_shortest_path()
     # Print the result
     logger.info("The solution of day17 PART%d is: %d", 2 if part2 else 1, result)
+    # The routes don't depend on the part, they are answered once
+    routes = [] if part2 else kwargs.get("routes_day17", [])
+    if routes and not isinstance(solver, PackedDijkstraSolver):
+        raise AdventOfCodeException("The routes are only found by the packed solver")
+    if routes:
+        for query, heat in zip(routes, solver.routes(routes)):
+            logger.info("Route %s -> %s (%d-%d blocks): %s", *query, heat)
     return result
 
 
-def parse_data(data_path: Path, part2: bool = False) -> DijkstraSolver:
+def parse_data(
+    data_path: Path,
+    part2: bool = False,
+    solver_class: Type[DijkstraSolver] = PackedDijkstraSolver,
+) -> DijkstraSolver:
     """Read Each Line and parse the content"""
-    solver: DijkstraSolver = DijkstraSolver()
+    solver: DijkstraSolver = solver_class()
     with open(data_path, "r") as f:
         for line in f:
             solver.add_line(line.strip())
-    solver.make_graph(part2)
+    solver.set_crucible(part2)
     return solver
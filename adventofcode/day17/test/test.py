@@ -1,10 +1,15 @@
 import os
+import time
 import unittest
 
-from ..main import day17
+from ..main import DijkstraSolver, day17, parse_data, parse_route
 
 FILE_PATH = os.path.abspath(__file__)
 EXAMPLE_DAY17 = os.path.dirname(FILE_PATH) + "/../data/example.txt"
+DATA_DAY17 = os.path.dirname(FILE_PATH) + "/../data/input.txt"
+# Maximum CPU time (in seconds) to solve both parts of the puzzle input:
+# about 0.8s are spent, the margin absorbs slower machines
+TIME_BUDGET = 2.0
 
 
 class TestDay17(unittest.TestCase):
@@ -16,6 +21,71 @@ class TestDay17(unittest.TestCase):
         result = day17(data_day17=EXAMPLE_DAY17, part2=True)
         self.assertEqual(result, 94)
 
+    def test_day17_tuple_solver(self):
+        result = day17(data_day17=EXAMPLE_DAY17, part2=True, solver_day17="tuple")
+        self.assertEqual(result, 94)
+
+    def test_day17_bucket_queue(self):
+        result = day17(data_day17=EXAMPLE_DAY17, queue_day17="bucket")
+        self.assertEqual(result, 102)
+        result = day17(data_day17=EXAMPLE_DAY17, part2=True, queue_day17="bucket")
+        self.assertEqual(result, 94)
+
+    def test_day17_path(self):
+        cost, path = parse_data(EXAMPLE_DAY17).find_path()
+        self.assertEqual(cost, 102)
+        self.assertEqual(path[0], (0, 0))
+        self.assertEqual(path[-1], (12, 12))
+        # The crucible turns after each move
+        for (i1, j1), (i2, j2), (i3, j3) in zip(path, path[1:], path[2:]):
+            self.assertTrue((i1 == i2 and j2 == j3) or (j1 == j2 and i2 == i3))
+
+    def test_day17_solvers_agree(self):
+        solver = parse_data(EXAMPLE_DAY17, part2=True, solver_class=DijkstraSolver)
+        self.assertEqual(solver.find_shortest_path(), 94)
+
+    def test_day17_astar(self):
+        for heuristic in ("manhattan", "reverse"):
+            for queue_type in ("heap", "bucket"):
+                result = day17(
+                    data_day17=EXAMPLE_DAY17,
+                    part2=True,
+                    queue_day17=queue_type,
+                    heuristic_day17=heuristic,
+                )
+                self.assertEqual(result, 94)
+
+    def test_day17_astar_expands_less(self):
+        for queue_type in ("heap", "bucket"):
+            solver = parse_data(EXAMPLE_DAY17)
+            expanded = solver.compare_heuristics(queue_type)
+            self.assertLess(expanded["manhattan"], expanded["none"])
+            self.assertLess(expanded["reverse"], expanded["manhattan"])
+
+    def test_day17_routes(self):
+        solver = parse_data(EXAMPLE_DAY17)
+        queries = [
+            ((0, 0), (12, 12), 1, 3),
+            ((0, 0), (12, 12), 4, 10),
+            ((0, 0), (0, 0), 1, 3),
+            ((0, 0), (0, 1), 13, 13),
+        ]
+        self.assertEqual(solver.routes(queries), [102, 94, 0, None])
+        # The search of a configuration is shared by its queries
+        self.assertEqual(len(solver.states), 3)
+        expanded = solver.states[(0, 1, 3)].expanded
+        self.assertEqual(solver.route((0, 0), (5, 5)), 42)
+        self.assertEqual(solver.states[(0, 1, 3)].expanded, expanded)
+
+    def test_day17_parse_route(self):
+        self.assertEqual(parse_route("0,0:12,12:4-10"), ((0, 0), (12, 12), 4, 10))
+
+    def test_day17_time_budget(self):
+        start = time.process_time()
+        self.assertEqual(day17(data_day17=DATA_DAY17), 1008)
+        self.assertEqual(day17(data_day17=DATA_DAY17, part2=True), 1210)
+        self.assertLess(time.process_time() - start, TIME_BUDGET)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,13 +3,20 @@ import copy
 import math
 import os
 import re
+from array import array
+from itertools import chain
 from logging import Logger
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 from utils.error import AdventOfCodeException
 from utils.logger import MyLogger
 
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only used by the batch engine
+    np = None
+
 FILE_PATH = os.path.abspath(__file__)
 DEFAULT_DAY19_DATA = os.path.dirname(FILE_PATH) + "/data/input.txt"
 
@@ -26,32 +33,92 @@ def get_parser_day19() -> argparse.ArgumentParser:
     day19.add_argument(
         "--data-day19", type=Path, help="data to decode", default=DEFAULT_DAY19_DATA
     )
+    day19.add_argument(
+        "--engine-day19",
+        choices=ENGINES,
+        help="implementation of the classification of the parts (PART1)",
+        default="compiled",
+    )
+    day19.add_argument(
+        "--solver-day19",
+        choices=SOLVERS,
+        help="implementation of the count of the accepted ratings (PART2)",
+        default="dfs",
+    )
+    day19.add_argument(
+        "--parts-day19",
+        type=Path,
+        nargs="+",
+        help="other part files to check against the workflows (PART1, with the index)",
+        default=[],
+    )
     return parser
 
 
+# Implementations of Workflows.accept_parts:
+# - compiled: each part follows the compiled workflows one by one
+# - batch: the parts are numpy columns and whole masks of rows follow the
+#   workflows (compiled is used when numpy is not installed)
+# - index: the parts are looked up in a k-d tree of the accepted boxes
+ENGINES = ("compiled", "batch", "index")
+# Implementations of Workflows.accept_rules:
+# - dfs: depth first walk of the workflows splitting one box in place
+# - rounds: all the pending conditions are split round after round
+SOLVERS = ("dfs", "rounds")
+
 Rule = List[str]
+# A condition compiled at parse time: (index of the rating in "xmas", True
+# for '<' and False for '>', threshold, target workflow)
+CompiledRule = Tuple[int, bool, int, str]
+# The conditions of a workflow and its fallback target
+Workflow = Tuple[Tuple[CompiledRule, ...], str]
+# The x, m, a, s ratings of a part
+Ratings = Sequence[int]
+# Lower and upper (excluded) bounds of x, m, a and s: [x0, x1, m0, m1, ...]
+Box = List[int]
+# A workflow being visited: [conditions, fallback, next condition, box when
+# entered, bounds index of the split rating, remaining lower/upper bounds]
+Frame = List[Any]
+# A node of the k-d tree: [rating index, split, lower node, upper node] or a
+# leaf tuple of boxes
+Node = Union[List[Any], Tuple[Box, ...]]
+# Maximum number of boxes in a leaf of the k-d tree
+LEAF_SIZE = 8
+
+KEYS = "xmas"
+WORKFLOW_PATTERN = re.compile(r"(?P<name>\w+){(?P<rule>.+)}")
+RULE_PATTERN = re.compile(r"(?P<key>[xmas])(?P<op>[<>])(?P<value>\d+):(?P<target>\w+)")
+PART_PATTERN = re.compile(r"{x=(?P<x>\d+),m=(?P<m>\d+),a=(?P<a>\d+),s=(?P<s>\d+)}")
 
 
-class Part:
-    def __init__(self, **kwargs) -> None:
-        self.__dict__.update(kwargs)
+def volume(box: Box) -> int:
+    return (box[1] - box[0]) * (box[3] - box[2]) * (box[5] - box[4]) * (box[7] - box[6])
 
-    def apply_rules(self, rules: Dict[str, Rule], next_rule: str = "in") -> int:
-        while next_rule:
-            if next_rule == "A":
-                return sum([x for x in self.__dict__.values()])
-            elif next_rule == "R":
-                return 0
-            next_rule = self.apply_rule(rules[next_rule])
-        raise AdventOfCodeException("no next rule found")
 
-    def apply_rule(self, rules: Rule) -> str:
-        if not rules:
-            return ""
-        for rule in rules[:-1]:
-            if eval("self." + rule.split(":")[0], {"self": self}):
-                return rule.split(":")[1]
-        return rules[-1]
+def clip(box: Box, bound: int, value: int) -> Box:
+    box = box[:]
+    box[bound] = value
+    return box
+
+
+def compile_workflow(rules: Rule) -> Workflow:
+    """Compile the rules of a workflow into tuples (no string handled later)"""
+    if not rules:
+        raise AdventOfCodeException("a workflow requires at least one rule")
+    compiled: List[CompiledRule] = []
+    for rule in rules[:-1]:
+        match = RULE_PATTERN.fullmatch(rule)
+        if not match:
+            raise AdventOfCodeException(f"invalid rule: '{rule}'")
+        compiled.append(
+            (
+                KEYS.index(match.group("key")),
+                match.group("op") == "<",
+                int(match.group("value")),
+                match.group("target"),
+            )
+        )
+    return tuple(compiled), rules[-1]
 
 
 class Condition:
@@ -94,23 +161,207 @@ class Condition:
         return f"{self.rule_name} if {self.accepted_condition}"
 
 
+class AcceptedIndex:
+    """
+    k-d tree of the disjoint boxes accepted by the workflows.
+
+    Each node splits the boxes at the median lower bound of the rating which
+    gives the smallest halves (the boxes across the split are clipped on both
+    sides) until a leaf holds at most 'leaf_size' boxes. A part is accepted
+    when it is inside one of the boxes of the leaf it falls into.
+    """
+
+    def __init__(self, boxes: List[Box], leaf_size: int = LEAF_SIZE) -> None:
+        self.boxes = boxes
+        self.leaf_size = leaf_size
+        self.volume = sum(map(volume, boxes))
+        self.root = self.build(boxes)
+
+    @classmethod
+    def from_workflows(
+        cls, workflows: "Workflows", leaf_size: int = LEAF_SIZE
+    ) -> "AcceptedIndex":
+        return cls(list(workflows.accepted_boxes()), leaf_size)
+
+    def build(self, boxes: List[Box]) -> Node:
+        """Build the tree with an explicit stack (a split may be unbalanced)"""
+        root: List[Any] = [None]
+        # Boxes of a node to build with its parent and its slot in the parent
+        pending = [(boxes, root, 0)]
+        while pending:
+            boxes, parent, slot = pending.pop()
+            split = self.split(boxes)
+            if split is None:
+                parent[slot] = tuple(boxes)
+                continue
+            key, value, left, right = split
+            parent[slot] = node = [key, value, None, None]
+            pending.append((left, node, 2))
+            pending.append((right, node, 3))
+        return root[0]
+
+    def split(
+        self, boxes: List[Box]
+    ) -> Optional[Tuple[int, int, List[Box], List[Box]]]:
+        """Return the rating, the value and the boxes on each side of a split"""
+        if len(boxes) <= self.leaf_size:
+            return None
+        best = None
+        for key in range(4):
+            lows = sorted(box[2 * key] for box in boxes)
+            split = lows[len(lows) // 2]
+            left = [box for box in boxes if box[2 * key] < split]
+            right = [box for box in boxes if box[2 * key + 1] > split]
+            size = max(len(left), len(right))
+            if size < len(boxes) and (best is None or size < best[0]):
+                best = (size, key, split, left, right)
+        if best is None:
+            return None
+        _, key, split, left, right = best
+        bound = 2 * key
+        left = [
+            box if box[bound + 1] <= split else clip(box, bound + 1, split)
+            for box in left
+        ]
+        right = [
+            box if box[bound] >= split else clip(box, bound, split) for box in right
+        ]
+        return key, split, left, right
+
+    def __contains__(self, ratings: Ratings) -> bool:
+        return any(
+            all(box[2 * key] <= ratings[key] < box[2 * key + 1] for key in range(4))
+            for box in self.boxes_of(ratings)
+        )
+
+    def boxes_of(self, ratings: Ratings) -> Sequence[Box]:
+        """Return the boxes of the leaf where 'ratings' falls"""
+        node = self.root
+        while type(node) is list:
+            key, split, left, right = node
+            node = left if ratings[key] < split else right
+        return node
+
+    def accept_parts(self, parts: Iterable[Ratings]) -> int:
+        """Sum the ratings of the accepted parts (the tree walk is inlined)"""
+        total = 0
+        root = self.root
+        for part in parts:
+            node = root
+            while type(node) is list:
+                key, split, left, right = node
+                node = left if part[key] < split else right
+            x, m, a, s = part
+            for box in node:
+                if (
+                    box[0] <= x < box[1]
+                    and box[2] <= m < box[3]
+                    and box[4] <= a < box[5]
+                    and box[6] <= s < box[7]
+                ):
+                    total += x + m + a + s
+                    break
+        return total
+
+
 class Workflows:
     def __init__(self) -> None:
         self.rules_dict: Dict[str, Rule] = {}
-        self.parts: List[Part] = []
+        self.workflows: Dict[str, Workflow] = {}
+        # Ratings of all the parts, 4 consecutive ints per part
+        self.parts = array("q")
         self.conditions: Dict[str, List[Dict[str, range]]] = {
             "in": [{key: range(1, 4001) for key in "xmas"}]
         }
         # self.conditions["in"][0]["name"] = ["in"]
+        self.index: Optional[AcceptedIndex] = None
 
     def add_rule(self, name_rule: str, rules: Rule):
         self.rules_dict[name_rule] = rules
+        self.workflows[name_rule] = compile_workflow(rules)
+        self.index = None
+
+    def validate(self) -> None:
+        """Check that 'in' and every target of the rules are known workflows"""
+        targets = {"in"}
+        for rules, default in self.workflows.values():
+            targets.update(target for *_, target in rules)
+            targets.add(default)
+        missing = sorted(targets - self.workflows.keys() - {"A", "R"})
+        if missing:
+            raise AdventOfCodeException(f"unknown workflow(s): {', '.join(missing)}")
+
+    def add_part(self, x: int, m: int, a: int, s: int):
+        self.parts.extend((x, m, a, s))
 
-    def add_part(self, **kwargs):
-        self.parts.append(Part(**kwargs))
+    def get_parts(self) -> Iterator[Ratings]:
+        ratings = iter(self.parts)
+        return zip(ratings, ratings, ratings, ratings)
 
-    def accept_parts(self) -> int:
-        return sum(part.apply_rules(self.rules_dict) for part in self.parts)
+    def is_accepted(self, ratings: Ratings, name: str = "in") -> bool:
+        """Follow the compiled workflows from 'name' until 'A' or 'R'"""
+        workflows = self.workflows
+        while name != "A" and name != "R":
+            if name not in workflows:
+                raise AdventOfCodeException(f"unknown workflow: '{name}'")
+            rules, name = workflows[name]
+            for key, lower, value, target in rules:
+                if ratings[key] < value if lower else ratings[key] > value:
+                    name = target
+                    break
+        return name == "A"
+
+    def accept_parts(self, engine: str = "compiled") -> int:
+        if engine not in ENGINES:
+            raise AdventOfCodeException(f"Unknown engine: {engine}")
+        if engine == "batch":
+            if np is not None:
+                return self.accept_parts_batch()
+            logger.warning(
+                "numpy is not installed, the parts are classified one by one"
+            )
+        if engine == "index":
+            return self.get_index().accept_parts(self.get_parts())
+        return sum(sum(part) for part in self.get_parts() if self.is_accepted(part))
+
+    def get_index(self) -> AcceptedIndex:
+        """Return the index of the accepted boxes (built once)"""
+        if self.index is None:
+            self.index = AcceptedIndex.from_workflows(self)
+        return self.index
+
+    def accept_parts_batch(self) -> int:
+        """
+        Classify all the parts at once with numpy.
+
+        The ratings are split into 4 columns (x, m, a, s) and each workflow
+        receives the array of the rows which reach it: every condition splits
+        these rows with a mask between its target and the next condition.
+        """
+        columns = np.frombuffer(self.parts, dtype=np.int64).reshape(-1, 4).T.copy()
+        pending = [("in", np.arange(columns.shape[1]))]
+        total = 0
+        while pending:
+            name, rows = pending.pop()
+            if name == "A":
+                total += int(columns[:, rows].sum())
+                continue
+            if name == "R":
+                continue
+            if name not in self.workflows:
+                raise AdventOfCodeException(f"unknown workflow: '{name}'")
+            rules, fallback = self.workflows[name]
+            for key, lower, value, target in rules:
+                ratings = columns[key, rows]
+                mask = ratings < value if lower else ratings > value
+                if mask.any():
+                    pending.append((target, rows[mask]))
+                    rows = rows[~mask]
+                if len(rows) == 0:
+                    break
+            else:
+                pending.append((fallback, rows))
+        return total
 
     def process_rule(self) -> bool:
         accepted_condition: Dict[str, List[Dict[str, range]]] = {"A": [], "R": []}
@@ -161,7 +412,65 @@ class Workflows:
         self.conditions = accepted_condition
         return True if any(key not in "AR" for key in self.conditions.keys()) else False
 
-    def accept_rules(self) -> int:
+    def count_accepted(self, name: str = "in", box: Optional[Box] = None) -> int:
+        """Count the ratings of 'box' (1 to 4000 by default) accepted from 'name'"""
+        return sum(map(volume, self.accepted_boxes(name, box)))
+
+    def accepted_boxes(
+        self, name: str = "in", box: Optional[Box] = None
+    ) -> Iterator[Box]:
+        """
+        Yield the disjoint boxes of 'box' (1 to 4000 by default) accepted from 'name'.
+
+        The workflows are walked depth first with an explicit stack. Each
+        condition narrows the box in place before visiting its target, then
+        the box gets the remaining bounds for the next condition: only the
+        box of each workflow on the stack is saved (8 ints per level).
+        """
+        box = [1, 4001] * 4 if box is None else list(box)
+        workflows = self.workflows
+        frames: List[Frame] = []
+        target: Optional[str] = name
+        while target is not None:
+            if target == "A":
+                yield box[:]
+            elif target != "R":
+                if target not in workflows:
+                    raise AdventOfCodeException(f"unknown workflow: '{target}'")
+                frames.append([*workflows[target], 0, box[:], -1, 0, 0])
+            target = None
+            while frames and target is None:
+                frame = frames[-1]
+                rules, fallback, index, saved, bound, low, high = frame
+                if bound >= 0:
+                    # Back from the target of a condition: keep what is left
+                    box[bound], box[bound + 1] = low, high
+                    frame[4] = -1
+                if index > len(rules) or (bound >= 0 and box[bound] >= box[bound + 1]):
+                    box[:] = saved
+                    frames.pop()
+                    continue
+                frame[2] += 1
+                if index == len(rules):
+                    target = fallback
+                    continue
+                key, lower, value, target = rules[index]
+                bound = 2 * key
+                low, high = box[bound], box[bound + 1]
+                split = min(max(value if lower else value + 1, low), high)
+                if lower:
+                    box[bound + 1], frame[4:] = split, [bound, split, high]
+                else:
+                    box[bound], frame[4:] = split, [bound, low, split]
+                if box[bound] >= box[bound + 1]:
+                    # Nothing matches the condition
+                    target = None
+
+    def accept_rules(self, solver: str = "dfs") -> int:
+        if solver not in SOLVERS:
+            raise AdventOfCodeException(f"Unknown solver: {solver}")
+        if solver == "dfs":
+            return self.count_accepted()
         while self.process_rule():
             pass
         return sum(
@@ -188,30 +497,57 @@ def day19(part2: bool = False, **kwargs) -> int:
 
     workflow: Workflows = parse_data(kwargs["data_day19"])
     if part2:
-        result = workflow.accept_rules()
+        result = workflow.accept_rules(kwargs.get("solver_day19", "dfs"))
     else:
-        result = workflow.accept_parts()
+        result = workflow.accept_parts(kwargs.get("engine_day19", "compiled"))
+        for parts_path in kwargs.get("parts_day19", []):
+            # The index is built once for all the part files
+            total = workflow.get_index().accept_parts(parse_parts(parts_path))
+            logger.info("The accepted parts of %s sum to: %d", parts_path, total)
     # Print the result
     logger.info("The solution of day19 PART%d is: %d", 2 if part2 else 1, result)
     return result
 
 
 def parse_data(data_path: Path) -> Workflows:
-    """Read Each Line and parse the content"""
+    """Read the workflows line by line then stream the parts"""
     workflow: Workflows = Workflows()
     with open(data_path, "r") as f:
         for line in f:
             strip_line = line.strip()
-            match_rule = re.match(r"(?P<name>.+){(?P<rule>.+)}", strip_line)
-            match_part = re.match(
-                r"{x=(?P<x>.+),m=(?P<m>.+),a=(?P<a>.+),s=(?P<s>.+)}", strip_line
+            # The parts start with the first rating, not the first blank line
+            if strip_line.startswith("{"):
+                workflow.parts = read_parts(chain([strip_line], f))
+                break
+            if not strip_line:
+                continue
+            match_rule = WORKFLOW_PATTERN.fullmatch(strip_line)
+            if not match_rule:
+                raise AdventOfCodeException(f"invalid workflow: '{strip_line}'")
+            workflow.add_rule(
+                match_rule.group("name"), match_rule.group("rule").split(",")
             )
-            if match_rule:
-                workflow.add_rule(
-                    match_rule.group("name"), match_rule.group("rule").split(",")
-                )
-            elif match_part:
-                workflow.add_part(
-                    **{k: int(v) for k, v in match_part.groupdict().items()}
-                )
+    workflow.validate()
     return workflow
+
+
+def read_parts(lines: Iterable[str]) -> array:
+    """Return the ratings of the parts of 'lines', 4 consecutive ints per part"""
+    # The part files are large: they are streamed into a compact array
+    ratings = array("q")
+    for line in lines:
+        strip_line = line.strip()
+        if not strip_line:
+            continue
+        match_part = PART_PATTERN.fullmatch(strip_line)
+        if not match_part:
+            raise AdventOfCodeException(f"invalid part: '{strip_line}'")
+        ratings.extend(map(int, match_part.groups()))
+    return ratings
+
+
+def parse_parts(data_path: Path) -> Iterator[Ratings]:
+    """Read a file of parts (without workflows)"""
+    with open(data_path, "r") as f:
+        ratings = iter(read_parts(f))
+    return zip(ratings, ratings, ratings, ratings)
@@ -1,21 +1,149 @@
 import os
+import tempfile
 import unittest
 
-from ..main import day19
+from utils.error import AdventOfCodeException
+
+from .. import main
+from ..main import (
+    ENGINES,
+    SOLVERS,
+    AcceptedIndex,
+    Workflows,
+    compile_workflow,
+    day19,
+    parse_data,
+    parse_parts,
+)
 
 FILE_PATH = os.path.abspath(__file__)
 EXAMPLE_DAY19 = os.path.dirname(FILE_PATH) + "/../data/example.txt"
 
 
 class TestDay19(unittest.TestCase):
-    # def test_day19_part1(self):
-    #     result = day19(data_day19=EXAMPLE_DAY19)
-    #     self.assertEqual(result, 19114)
+    def test_day19_part1(self):
+        result = day19(data_day19=EXAMPLE_DAY19)
+        self.assertEqual(result, 19114)
 
     def test_day19_part2(self):
         result = day19(data_day19=EXAMPLE_DAY19, part2=True)
         self.assertEqual(result, 167409079868000)
 
+    def test_day19_engines(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                result = day19(data_day19=EXAMPLE_DAY19, engine_day19=engine)
+                self.assertEqual(result, 19114)
+        with self.assertRaises(AdventOfCodeException):
+            day19(data_day19=EXAMPLE_DAY19, engine_day19="unknown")
+
+    def test_day19_solvers(self):
+        for solver in SOLVERS:
+            with self.subTest(solver=solver):
+                result = day19(
+                    data_day19=EXAMPLE_DAY19, part2=True, solver_day19=solver
+                )
+                self.assertEqual(result, 167409079868000)
+        with self.assertRaises(AdventOfCodeException):
+            day19(data_day19=EXAMPLE_DAY19, part2=True, solver_day19="unknown")
+
+    def test_count_accepted(self):
+        workflow = parse_data(EXAMPLE_DAY19)
+        # lnx accepts everything, crn accepts x > 2662
+        self.assertEqual(workflow.count_accepted("lnx"), 4000**4)
+        self.assertEqual(workflow.count_accepted("crn"), 1338 * 4000**3)
+        self.assertEqual(
+            workflow.count_accepted("crn", [2000, 3000] * 4), 337 * 1000**3
+        )
+        self.assertEqual(workflow.count_accepted("crn", [1, 2000] * 4), 0)
+        # Deeper than the recursion limit: each workflow rejects one more x
+        workflow = Workflows()
+        for i in range(3000):
+            workflow.add_rule(f"w{i}" if i else "in", [f"x<{i + 2}:R", f"w{i + 1}"])
+        workflow.add_rule("w3000", ["A"])
+        self.assertEqual(workflow.count_accepted(), 1000 * 4000**3)
+
+    def test_accepted_index(self):
+        workflow = parse_data(EXAMPLE_DAY19)
+        index = workflow.get_index()
+        self.assertIs(workflow.get_index(), index)
+        self.assertEqual(index.volume, 167409079868000)
+        accepted = [part in index for part in workflow.get_parts()]
+        self.assertEqual(accepted, [True, False, True, False, True])
+        self.assertEqual(index.accept_parts(workflow.get_parts()), 19114)
+        # Small leaves to check the split of the boxes
+        index = AcceptedIndex.from_workflows(workflow, leaf_size=1)
+        self.assertIsInstance(index.root, list)
+        self.assertEqual(index.accept_parts(workflow.get_parts()), 19114)
+        self.assertEqual([len(box) for box in index.boxes_of((1, 1, 1, 1))], [8])
+
+    def test_accepted_index_many_boxes(self):
+        # 3000 boxes along s with the x bounds of each one narrowed a bit more
+        boxes = [[i, 4001, 1, 4001, 1, 4001, i, i + 1] for i in range(1, 3001)]
+        index = AcceptedIndex(boxes, leaf_size=1)
+        self.assertEqual(
+            index.volume, sum((4001 - i) * 4000**2 for i in range(1, 3001))
+        )
+        self.assertIn((10, 1, 1, 10), index)
+        self.assertNotIn((9, 1, 1, 10), index)
+        self.assertNotIn((4000, 1, 1, 3001), index)
+
+    def test_day19_other_parts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "parts.txt")
+            with open(path, "w") as f:
+                f.write("{x=787,m=2655,a=1222,s=2876}\n{x=1679,m=44,a=2067,s=496}\n")
+            result = day19(data_day19=EXAMPLE_DAY19, parts_day19=[path, path])
+            index = parse_data(EXAMPLE_DAY19).get_index()
+            self.assertEqual(index.accept_parts(parse_parts(path)), 7540)
+            with open(path, "a") as f:
+                f.write("{x=1,m=2,a=3}\n")
+            with self.assertRaises(AdventOfCodeException):
+                parse_parts(path)
+        self.assertEqual(result, 19114)
+
+    @unittest.skipIf(main.np is None, "numpy is not installed")
+    def test_accept_parts_batch(self):
+        workflow = parse_data(EXAMPLE_DAY19)
+        self.assertEqual(workflow.accept_parts_batch(), 19114)
+        workflow.workflows["in"] = ((), "unknown")
+        with self.assertRaises(AdventOfCodeException):
+            workflow.accept_parts_batch()
+
+    def test_parse_data(self):
+        with open(EXAMPLE_DAY19) as f:
+            lines = f.readlines()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "day19.txt")
+            # A stray blank line in the workflows doesn't end them
+            with open(path, "w") as f:
+                f.writelines(lines[:3] + ["\n"] + lines[3:])
+            self.assertEqual(day19(data_day19=path), 19114)
+            for workflows, missing in (
+                (["px{a<2006:qkq,R}\n", "qkq{A}\n"], "in"),
+                (["in{x<5:px,R}\n", "px{a<2006:qkq,R}\n"], "qkq"),
+            ):
+                with open(path, "w") as f:
+                    f.writelines(workflows + ["\n", "{x=1,m=2,a=3,s=4}\n"])
+                with self.assertRaisesRegex(AdventOfCodeException, missing):
+                    parse_data(path)
+
+    def test_compile_workflow(self):
+        self.assertEqual(
+            compile_workflow(["a<2006:qkq", "m>2090:A", "rfg"]),
+            (((2, True, 2006, "qkq"), (1, False, 2090, "A")), "rfg"),
+        )
+        with self.assertRaises(AdventOfCodeException):
+            compile_workflow(["a=2006:qkq", "rfg"])
+
+    def test_is_accepted(self):
+        workflow = parse_data(EXAMPLE_DAY19)
+        accepted = [workflow.is_accepted(part) for part in workflow.get_parts()]
+        self.assertEqual(accepted, [True, False, True, False, True])
+        self.assertTrue(workflow.is_accepted((0, 0, 0, 0), "lnx"))
+        with self.assertRaises(AdventOfCodeException):
+            workflow.is_accepted((0, 0, 0, 0), "unknown")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,14 @@
 import argparse
+import hashlib
+import json
+import math
 import os
 import re
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from logging import Logger
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 
 from utils.error import AdventOfCodeException
 from utils.logger import MyLogger
@@ -24,9 +29,28 @@ def get_parser_day5() -> argparse.ArgumentParser:
     day5.add_argument(
         "--data-day5", type=Path, help="data to decode", default=DEFAULT_DAY5_DATA
     )
+    day5.add_argument(
+        "--engine-day5",
+        choices=ENGINES,
+        help="implementation of the mapping of the seed ranges",
+        default="sweep",
+    )
+    day5.add_argument(
+        "--cache-day5",
+        type=Path,
+        help="directory to store the compiled almanacs (keyed by file hash)",
+    )
     return parser
 
 
+# Implementations of Almanac.find_lowest_position:
+# - sweep: sorted ranges mapped in one sweep over the sorted correspondances
+# - pipeline: ranges mapped lazily by a chain of generators
+# - compiled: all the maps composed into one PiecewiseMap
+# - linear: each range tested against each correspondance
+ENGINES = ("sweep", "pipeline", "compiled", "linear")
+
+
 class Correspondance:
     def __init__(self, correspondance: List[str]) -> None:
         self.source = int(correspondance[1])
@@ -86,9 +110,27 @@ class Correspondance:
         )
 
 
+def merge_ranges(ranges: Iterable[range]) -> List[range]:
+    """Sort the ranges and merge those which overlap or are adjacent"""
+    merged: List[range] = []
+    for my_range in sorted(ranges, key=lambda r: r.start):
+        if not my_range:
+            continue
+        if merged and my_range.start <= merged[-1].stop:
+            if my_range.stop > merged[-1].stop:
+                merged[-1] = range(merged[-1].start, my_range.stop)
+        else:
+            merged.append(my_range)
+    return merged
+
+
 class AlmanacMap:
     def __init__(self) -> None:
         self.correspondances: List[Correspondance] = []
+        # Correspondances sorted by source: [starts[i] ; ends[i]) + offsets[i]
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.offsets: List[int] = []
 
     def add_correspondence(self, correspondance: Correspondance):
         self.correspondances.append(correspondance)
@@ -109,12 +151,153 @@ class AlmanacMap:
             correspondance.apply(old_objects, new_objects)
         old_objects.extend(new_objects)
 
+    def compile(self) -> None:
+        """Sort the correspondances by source (they don't overlap)"""
+        ordered = sorted(self.correspondances, key=lambda c: c.source)
+        self.starts = [c.source for c in ordered]
+        self.ends = [c.source + c.range_lenght for c in ordered]
+        self.offsets = [c.destination - c.source for c in ordered]
+
+    def map_ranges_lazy(self, ranges: Iterable[range]) -> Iterator[range]:
+        """
+        Yield the mapped parts of each range, in any order: the first
+        correspondance of a range is found by binary search.
+        """
+        if len(self.starts) != len(self.correspondances):
+            self.compile()
+        starts, ends, offsets = self.starts, self.ends, self.offsets
+        for my_range in ranges:
+            start, stop = my_range.start, my_range.stop
+            index = bisect_right(ends, start)
+            while start < stop:
+                if index == len(starts) or starts[index] >= stop:
+                    yield range(start, stop)
+                    break
+                if start < starts[index]:
+                    yield range(start, starts[index])
+                    start = starts[index]
+                end = min(stop, ends[index])
+                yield range(start + offsets[index], end + offsets[index])
+                start = end
+                index += 1
+
+    def map_ranges(self, ranges: List[range]) -> List[range]:
+        """
+        Map sorted and disjoint ranges in a single sweep over the sorted
+        correspondances, the parts between them are kept as is. The result
+        is sorted and its overlapping or adjacent ranges are merged.
+        """
+        if len(self.starts) != len(self.correspondances):
+            self.compile()
+        starts, ends, offsets = self.starts, self.ends, self.offsets
+        mapped: List[range] = []
+        first = 0
+        for my_range in ranges:
+            start, stop = my_range.start, my_range.stop
+            # The next ranges start after this one: skip what is before it
+            while first < len(starts) and ends[first] <= start:
+                first += 1
+            index = first
+            while start < stop:
+                if index == len(starts) or starts[index] >= stop:
+                    mapped.append(range(start, stop))
+                    break
+                if start < starts[index]:
+                    mapped.append(range(start, starts[index]))
+                    start = starts[index]
+                end = min(stop, ends[index])
+                mapped.append(range(start + offsets[index], end + offsets[index]))
+                start = end
+                index += 1
+        return merge_ranges(mapped)
+
+
+class PiecewiseMap:
+    """
+    Function x -> x + offsets[i] for x in [breaks[i] ; breaks[i + 1])
+
+    The first break is 0 and the last piece has no end.
+    """
+
+    def __init__(self, breaks: List[int], offsets: List[int]) -> None:
+        self.breaks = breaks
+        self.offsets = offsets
+
+    @classmethod
+    def from_almanac_map(cls, almanac_map: AlmanacMap) -> "PiecewiseMap":
+        breaks, offsets = [0], [0]
+        for correspondance in sorted(
+            almanac_map.correspondances, key=lambda c: c.source
+        ):
+            start = correspondance.source
+            if start != breaks[-1]:
+                breaks.append(start)
+                offsets.append(0)
+            offsets[-1] = correspondance.destination - start
+            breaks.append(start + correspondance.range_lenght)
+            offsets.append(0)
+        return cls(breaks, offsets).simplify()
+
+    def simplify(self) -> "PiecewiseMap":
+        """Merge the consecutive pieces with the same offset"""
+        breaks, offsets = [self.breaks[0]], [self.offsets[0]]
+        for start, offset in zip(self.breaks[1:], self.offsets[1:]):
+            if offset != offsets[-1]:
+                breaks.append(start)
+                offsets.append(offset)
+        return PiecewiseMap(breaks, offsets)
+
+    def then(self, other: "PiecewiseMap") -> "PiecewiseMap":
+        """Return the function x -> other(self(x))"""
+        breaks: List[int] = []
+        offsets: List[int] = []
+        ends = self.breaks[1:] + [math.inf]
+        for start, end, offset in zip(self.breaks, ends, self.offsets):
+            # Split the image of the piece by the pieces of 'other'
+            index = bisect_right(other.breaks, start + offset) - 1
+            while index < len(other.breaks) and other.breaks[index] < end + offset:
+                breaks.append(max(start, other.breaks[index] - offset))
+                offsets.append(offset + other.offsets[index])
+                index += 1
+        return PiecewiseMap(breaks, offsets).simplify()
+
+    def __call__(self, value: int) -> int:
+        return value + self.offsets[bisect_right(self.breaks, value) - 1]
+
+    def lowest(self, ranges: Iterable[range]) -> int:
+        """
+        Lowest image of the ranges: the function increases on each piece so
+        only the start of the ranges and the breaks inside them are tested.
+        """
+        lowest = math.inf
+        for my_range in ranges:
+            first = bisect_right(self.breaks, my_range.start)
+            last = bisect_left(self.breaks, my_range.stop)
+            lowest = min(
+                lowest,
+                self(my_range.start),
+                *(self.breaks[i] + self.offsets[i] for i in range(first, last)),
+            )
+        return lowest
+
+    def save(self, path: Path) -> None:
+        with open(path, "w") as f:
+            json.dump({"breaks": self.breaks, "offsets": self.offsets}, f)
+
+    @classmethod
+    def load(cls, path: Path) -> "PiecewiseMap":
+        with open(path, "r") as f:
+            table = json.load(f)
+        return cls(table["breaks"], table["offsets"])
+
 
 class Almanac:
     def __init__(self) -> None:
         # Note: All seeds are store into range object (faster than one by one)
         self.seeds: List[range] = []
         self.almanac_maps: List[AlmanacMap] = []
+        # All the maps composed into one function (see compile)
+        self.table: Optional[PiecewiseMap] = None
 
     def set_seeds(self, seeds: List[range]):
         self.seeds = seeds
@@ -122,30 +305,91 @@ class Almanac:
     def add_almanac_map(self, almanc_map: AlmanacMap):
         self.almanac_maps.append(almanc_map)
 
-    def find_lowest_position(self) -> int:
+    def compile(self) -> PiecewiseMap:
+        """Compose the maps from seed to location into one PiecewiseMap"""
+        if self.table is None:
+            self.table = PiecewiseMap([0], [0])
+            for almanac_map in self.almanac_maps:
+                self.table = self.table.then(PiecewiseMap.from_almanac_map(almanac_map))
+        return self.table
+
+    def prepare(self) -> None:
+        """Sort the correspondances up front so the maps are only read"""
+        for almanac_map in self.almanac_maps:
+            almanac_map.compile()
+
+    def locations(self, seeds: Iterable[range]) -> Iterator[range]:
+        """Chain the generators of each AlmanacMap from seeds to locations"""
+        ranges: Iterator[range] = iter(seeds)
+        for almanac_map in self.almanac_maps:
+            ranges = almanac_map.map_ranges_lazy(ranges)
+        return ranges
+
+    def find_lowest_position(
+        self, engine: str = "sweep", seeds: Optional[List[range]] = None
+    ) -> int:
+        """
+        Find the lowest location of 'seeds' (the seeds of the almanac by
+        default). The almanac is never modified, so it could be shared by
+        several queries.
+        """
+        seeds = self.seeds if seeds is None else seeds
+        if engine == "sweep":
+            return self.find_lowest_position_sweep(seeds)
+        if engine == "pipeline":
+            return min(location.start for location in self.locations(seeds))
+        if engine == "compiled":
+            return self.compile().lowest(seeds)
+        if engine == "linear":
+            return self.find_lowest_position_linear(seeds)
+        raise AdventOfCodeException(f"Unknown engine: {engine}")
+
+    def find_lowest_positions(
+        self, queries: List[List[range]], engine: str = "pipeline", jobs: int = 4
+    ) -> List[int]:
+        """Answer several queries of seeds at once with a pool of threads"""
+        self.prepare()
+        if engine == "compiled":
+            self.compile()
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            return list(
+                executor.map(
+                    lambda seeds: self.find_lowest_position(engine, seeds), queries
+                )
+            )
+
+    def find_lowest_position_sweep(self, seeds: List[range]) -> int:
+        """Map the sorted and merged seed ranges through each AlmanacMap"""
+        positions = merge_ranges(seeds)
+        for almanac_map in self.almanac_maps:
+            positions = almanac_map.map_ranges(positions)
+            logger.debug(positions)
+        return positions[0].start
+
+    def find_lowest_position_linear(self, seeds: List[range]) -> int:
         """
         Find the lowest postion for the seed list
 
-        Note: The 'seeds' list is updated to become a 'position' list.
-              We could avoid modifying the original list by passing a
-              shallow copy instead.
+        Note: The correspondances update the list of ranges in place, so
+              they are applied to a shallow copy of 'seeds'.
         """
-        logger.debug(self.seeds)
+        positions = list(seeds)
+        logger.debug(positions)
         for almanac_map in self.almanac_maps:
             # Note: Only work because an List is mutable
-            almanac_map.apply_correspondance(self.seeds)
-            logger.debug(self.seeds)
-        return min(self.seeds, key=lambda r: r.start).start
+            almanac_map.apply_correspondance(positions)
+            logger.debug(positions)
+        return min(positions, key=lambda r: r.start).start
 
 
-def day5(part2: bool = False, **kwargs) -> None:
+def day5(part2: bool = False, **kwargs) -> int:
     """
     Main routines for Day 5.
 
     :param data_day5: Path data to consider
     :param part2: bool Calculate solution for PART2 otherwise for PART1
 
-    :return: None.
+    :return: The lowest location number.
     """
     if "data_day5" not in kwargs:
         raise AdventOfCodeException("Undefined parameter 'data_day5'")
@@ -153,11 +397,29 @@ def day5(part2: bool = False, **kwargs) -> None:
     # Parse the file
     almanac: Almanac = parse_data(kwargs["data_day5"], part2)
 
+    engine = kwargs.get("engine_day5", "sweep")
+    if engine == "compiled" and kwargs.get("cache_day5"):
+        almanac.table = load_table(kwargs["data_day5"], almanac, kwargs["cache_day5"])
+
     # Find the lowest position
-    numbers = almanac.find_lowest_position()
+    numbers = almanac.find_lowest_position(engine)
 
     # Print the result
     logger.info("The solution of day5 PART%d is: %d", 2 if part2 else 1, numbers)
+    return numbers
+
+
+def load_table(data_path: Path, almanac: Almanac, cache_dir: Path) -> PiecewiseMap:
+    """Return the compiled almanac stored in 'cache_dir' (compiled if missing)"""
+    with open(data_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    path = Path(cache_dir) / f"day5-{digest}.json"
+    if path.exists():
+        return PiecewiseMap.load(path)
+    table = almanac.compile()
+    os.makedirs(cache_dir, exist_ok=True)
+    table.save(path)
+    return table
 
 
 def parse_data(data_path: Path, part2: bool) -> Almanac:
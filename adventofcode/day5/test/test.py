@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from ..main import (
+    ENGINES,
+    AlmanacMap,
+    Correspondance,
+    day5,
+    load_table,
+    merge_ranges,
+    parse_data,
+)
+
+FILE_PATH = os.path.abspath(__file__)
+EXAMPLE_DAY5_DATA = os.path.dirname(FILE_PATH) + "/../data/example.txt"
+
+
+class TestDay5(unittest.TestCase):
+    def test_day5_part1(self):
+        result = day5(data_day5=EXAMPLE_DAY5_DATA)
+        self.assertEqual(result, 35)
+
+    def test_day5_part2(self):
+        result = day5(data_day5=EXAMPLE_DAY5_DATA, part2=True)
+        self.assertEqual(result, 46)
+
+    def test_day5_engines(self):
+        for engine in ENGINES:
+            self.assertEqual(day5(data_day5=EXAMPLE_DAY5_DATA, engine_day5=engine), 35)
+            result = day5(data_day5=EXAMPLE_DAY5_DATA, part2=True, engine_day5=engine)
+            self.assertEqual(result, 46)
+
+    def test_merge_ranges(self):
+        ranges = [range(10, 12), range(0, 5), range(5, 7), range(3, 4), range(8, 8)]
+        self.assertEqual(merge_ranges(ranges), [range(0, 7), range(10, 12)])
+
+    def test_map_ranges(self):
+        almanac_map = AlmanacMap()
+        almanac_map.add_correspondence(Correspondance(["50", "98", "2"]))
+        almanac_map.add_correspondence(Correspondance(["52", "50", "48"]))
+        # 40-49 are kept, 50-59 -> 52-61, 97 -> 99, 98-99 -> 50-51, 100 is kept
+        self.assertEqual(
+            almanac_map.map_ranges([range(40, 60), range(97, 101)]),
+            [range(40, 62), range(99, 101)],
+        )
+
+    def test_compile(self):
+        almanac = parse_data(EXAMPLE_DAY5_DATA, part2=False)
+        table = almanac.compile()
+        # Seed 79 -> location 82, 14 -> 43, 55 -> 86, 13 -> 35
+        self.assertEqual([table(seed) for seed in (79, 14, 55, 13)], [82, 43, 86, 35])
+        self.assertEqual(table.lowest([range(79, 93), range(55, 68)]), 46)
+
+    def test_compile_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            almanac = parse_data(EXAMPLE_DAY5_DATA, part2=True)
+            table = load_table(EXAMPLE_DAY5_DATA, almanac, directory)
+            self.assertEqual(len(os.listdir(directory)), 1)
+            cached = load_table(EXAMPLE_DAY5_DATA, almanac, directory)
+            self.assertEqual(cached.breaks, table.breaks)
+            self.assertEqual(cached.offsets, table.offsets)
+            result = day5(
+                data_day5=EXAMPLE_DAY5_DATA,
+                part2=True,
+                engine_day5="compiled",
+                cache_day5=directory,
+            )
+            self.assertEqual(result, 46)
+
+    def test_queries_dont_modify_almanac(self):
+        almanac = parse_data(EXAMPLE_DAY5_DATA, part2=True)
+        seeds = list(almanac.seeds)
+        for engine in ENGINES:
+            self.assertEqual(almanac.find_lowest_position(engine), 46)
+            self.assertEqual(almanac.seeds, seeds)
+
+    def test_concurrent_queries(self):
+        almanac = parse_data(EXAMPLE_DAY5_DATA, part2=False)
+        queries = [[range(79, 80)], [range(14, 15)], [range(79, 93), range(55, 68)]]
+        for engine in ENGINES:
+            self.assertEqual(
+                almanac.find_lowest_positions(queries, engine, jobs=3), [82, 43, 46]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
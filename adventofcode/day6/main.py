@@ -38,16 +38,19 @@ class Races:
         """
         The solution is equivalent to solve k * (t -k) > d
         => ] (t - sqrt(t^2 -4d)) / 2 ; (t + sqrt(t^2 -4d)) / 2 [
+        The square root is an integer one: part 2 numbers don't fit in a float.
         """
         res: List[int] = []
         for index, t in enumerate(self.time):
             d = self.distance[index]
             delta = t**2 - 4 * d
             if delta > 0:
-                res.append(
-                    math.ceil((t + math.sqrt(delta)) / 2 - 1)
-                    - math.floor((t - math.sqrt(delta)) / 2)
-                )
+                # isqrt rounds down: move up to the first hold time which wins
+                low = (t - math.isqrt(delta)) // 2
+                while low <= t // 2 and low * (t - low) <= d:
+                    low += 1
+                # The winning hold times are symmetric around t / 2
+                res.append(max(t - 2 * low + 1, 0))
         return res
 
 
@@ -0,0 +1,226 @@
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from logging import Logger
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils.error import AdventOfCodeException
+from utils.generator import generate
+from utils.logger import MyLogger
+from utils.registry import Day
+from utils.runner import Task, run_task
+
+try:
+    import resource
+except ImportError:  # pragma: no cover (not available on windows)
+    resource = None
+
+logger: Logger = MyLogger().get_logger()
+
+PROC_STATUS = "/proc/self/status"
+# Timings are too noisy under this difference (in seconds) to be a regression
+NOISE_FLOOR = 0.005
+
+Stats = Dict[str, float]
+Report = Dict[str, Dict[str, Stats]]
+
+
+def get_bench_parser() -> argparse.ArgumentParser:
+    """Create a parser for the 'bench' command."""
+    parser = argparse.ArgumentParser(add_help=False)
+    bench = parser.add_argument_group("bench", "Benchmark the solutions.")
+    bench.add_argument(
+        "--repeat", type=parse_repeat, help="number of runs of each day/part", default=5
+    )
+    bench.add_argument("--output", type=Path, help="write the results as JSON")
+    bench.add_argument(
+        "--baseline", type=Path, help="JSON results of a previous run to compare with"
+    )
+    bench.add_argument(
+        "--threshold",
+        type=parse_threshold,
+        help="fail when a median is slower than the baseline by this ratio",
+        default=0.2,
+    )
+    bench.add_argument(
+        "--size",
+        type=int,
+        help="run on generated inputs of this size instead of the data files",
+    )
+    bench.add_argument(
+        "--seed", type=int, help="seed of the generated inputs", default=2023
+    )
+    bench.add_argument(
+        "--compare",
+        type=parse_variants,
+        metavar="OPTION=VALUE,...",
+        help="run each day/part once per value of an option e.g. queue_day17=heap,bucket",
+    )
+    return parser
+
+
+def parse_repeat(value: str) -> int:
+    """Parse the number of runs of a day/part (at least 1)"""
+    try:
+        repeat = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number of runs: '{value}'")
+    if repeat < 1:
+        raise argparse.ArgumentTypeError(f"the number of runs must be >= 1: {repeat}")
+    return repeat
+
+
+def parse_threshold(value: str) -> float:
+    """Parse the ratio of slowdown tolerated (at least 0)"""
+    try:
+        threshold = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid threshold: '{value}'")
+    if not threshold >= 0:
+        raise argparse.ArgumentTypeError(f"the threshold must be >= 0: {threshold}")
+    return threshold
+
+
+def parse_variants(value: str) -> List[Dict[str, str]]:
+    """Parse 'option=value1,value2' into [{option: value1}, {option: value2}]"""
+    option, _, values = value.partition("=")
+    if not option or not values:
+        raise argparse.ArgumentTypeError(f"invalid comparison: '{value}'")
+    return [{option.replace("-", "_"): v} for v in values.split(",")]
+
+
+def peak_rss() -> int:
+    """Return the peak resident set size of the current process in KB"""
+    # ru_maxrss is kept across fork and exec on linux, unlike VmHWM which
+    # belongs to the memory of the process
+    if os.path.exists(PROC_STATUS):
+        with open(PROC_STATUS, "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on linux
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile"""
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def bench_task(day: Day, part2: bool, repeat: int, kwargs: Dict[str, Any]) -> Stats:
+    """Run a day/part several times (expected to be in a dedicated process)"""
+    timings = [run_task(day, part2, kwargs).elapsed for _ in range(repeat)]
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "p95": percentile(timings, 95),
+        "max_rss_kb": peak_rss(),
+    }
+
+
+def find_regressions(report: Report, baseline: Report, threshold: float) -> List[str]:
+    """Return the day/part which are slower than the baseline"""
+    regressions: List[str] = []
+    for day, parts in report.items():
+        for part, stats in parts.items():
+            if part not in baseline.get(day, {}):
+                continue
+            before, after = baseline[day][part]["median"], stats["median"]
+            if after - before > max(before * threshold, NOISE_FLOOR):
+                regressions.append(
+                    f"{day} {part}: {before:.4f}s -> {after:.4f}s"
+                    f" (+{(after / before - 1) * 100 if before else math.inf:.0f}%)"
+                )
+    return regressions
+
+
+def run_bench(
+    tasks: List[Task],
+    repeat: int,
+    output: Optional[Path] = None,
+    baseline: Optional[Path] = None,
+    threshold: float = 0.2,
+    size: Optional[int] = None,
+    seed: int = 2023,
+    compare: Optional[List[Dict[str, str]]] = None,
+    **kwargs,
+) -> Report:
+    """
+    Benchmark each (day, part) task.
+
+    Every task runs in a new process so that the peak RSS is its own. When
+    'size' is defined, the tasks run on inputs generated with 'seed'. With
+    'compare', each task runs once per variant of an option of the days, the
+    option must be one of 'kwargs'.
+    The results could be written as JSON and compared to a baseline file: an
+    AdventOfCodeException is raised if a median is slower than the baseline
+    by more than 'threshold'.
+    """
+    unknown = sorted(
+        {option for variant in compare or [] for option in variant} - set(kwargs)
+    )
+    if unknown:
+        raise AdventOfCodeException(
+            f"Unknown option(s) to compare: {', '.join(unknown)}"
+        )
+
+    # The baseline is read first as it could be the 'output' of a previous run
+    baseline_report: Optional[Report] = None
+    if baseline:
+        with open(baseline, "r") as f:
+            baseline_report = json.load(f)["results"]
+
+    # Forked workers would inherit the peak RSS of this process
+    context = multiprocessing.get_context("spawn")
+    report: Report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        if size:
+            days = sorted({day.id for day, _ in tasks})
+            paths = generate(days, size, seed, Path(directory))
+            kwargs.update({f"data_day{day}": path for day, path in paths.items()})
+        for (day, part2), variant in itertools.product(tasks, compare or [{}]):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                stats = executor.submit(
+                    bench_task, day, part2, repeat, {**kwargs, **variant}
+                ).result()
+            name = str(day) + "".join(f"[{k}={v}]" for k, v in variant.items())
+            report.setdefault(name, {})[f"part{2 if part2 else 1}"] = stats
+            logger.info(
+                "%-6s PART%d min=%.4fs median=%.4fs p95=%.4fs rss=%dKB",
+                name,
+                2 if part2 else 1,
+                stats["min"],
+                stats["median"],
+                stats["p95"],
+                stats["max_rss_kb"],
+            )
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(
+                {"repeat": repeat, "size": size, "seed": seed, "results": report},
+                f,
+                indent=2,
+            )
+        logger.info("Results written in %s", output)
+
+    if baseline_report is not None:
+        regressions = find_regressions(report, baseline_report, threshold)
+        if regressions:
+            raise AdventOfCodeException(
+                "performance regression(s):\n" + "\n".join(regressions)
+            )
+        logger.info("No regression compared to %s", baseline)
+    return report
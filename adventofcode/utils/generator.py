@@ -0,0 +1,427 @@
+import argparse
+import random
+import string
+from collections import deque
+from logging import Logger
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Tuple
+
+from utils.error import AdventOfCodeException
+from utils.logger import MyLogger
+
+logger: Logger = MyLogger().get_logger()
+
+# A generator yields the lines of the input of a day, so that big inputs never
+# have to fit in memory. The meaning of 'size' is described by each generator
+# and the same seeded random.Random always produces the same input.
+Generator = Callable[[random.Random, int], Iterator[str]]
+
+NUMBER_WORDS = ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]
+
+
+def get_generator_parser() -> argparse.ArgumentParser:
+    """Create a parser for the 'generate' command."""
+    parser = argparse.ArgumentParser(add_help=False)
+    generate = parser.add_argument_group("generate", "Generate synthetic inputs.")
+    generate.add_argument(
+        "--size", type=int, help="size of the input (see each generator)", default=100
+    )
+    generate.add_argument(
+        "--seed", type=int, help="seed of the random generator", default=2023
+    )
+    generate.add_argument(
+        "--output",
+        type=Path,
+        help="directory where dayN.txt files are written",
+        default=Path("generated"),
+    )
+    return parser
+
+
+def skyline(
+    rng: random.Random, blocks: int, max_width: int, max_height: int
+) -> List[Tuple[str, int]]:
+    """
+    Return the moves of a clockwise rectilinear polygon without
+    self-intersection: a skyline of 'blocks' buildings over a flat ground.
+    """
+    heights: List[int] = []
+    for _ in range(blocks):
+        height = rng.randint(1, max_height)
+        while heights and height == heights[-1]:
+            height = rng.randint(1, max_height)
+        heights.append(height)
+    moves: List[Tuple[str, int]] = [("U", heights[0])]
+    for index, height in enumerate(heights):
+        if index:
+            delta = height - heights[index - 1]
+            moves.append(("U" if delta > 0 else "D", abs(delta)))
+        moves.append(("R", rng.randint(1, max_width)))
+    moves.append(("D", heights[-1]))
+    moves.append(("L", sum(dist for direct, dist in moves if direct == "R")))
+    return moves
+
+
+def generate_day1(rng: random.Random, size: int) -> Iterator[str]:
+    """'size' calibration lines mixing letters, digits and spelled digits"""
+    for _ in range(size):
+        tokens = [rng.choice(string.ascii_lowercase) for _ in range(rng.randint(1, 8))]
+        tokens.append(str(rng.randint(1, 9)))
+        tokens += [rng.choice(NUMBER_WORDS) for _ in range(rng.randint(0, 2))]
+        tokens += [str(rng.randint(1, 9)) for _ in range(rng.randint(0, 2))]
+        rng.shuffle(tokens)
+        yield "".join(tokens)
+
+
+def generate_day2(rng: random.Random, size: int) -> Iterator[str]:
+    """'size' games of cube sets"""
+    for game in range(1, size + 1):
+        cube_sets = []
+        for _ in range(rng.randint(1, 6)):
+            colors = rng.sample(["red", "green", "blue"], rng.randint(1, 3))
+            cube_sets.append(
+                ", ".join(f"{rng.randint(1, 20)} {color}" for color in colors)
+            )
+        yield f"Game {game}: " + "; ".join(cube_sets)
+
+
+def generate_day3(rng: random.Random, size: int) -> Iterator[str]:
+    """A 'size'x'size' engine schematic"""
+    for _ in range(size):
+        row: List[str] = []
+        while len(row) < size:
+            draw = rng.random()
+            if draw < 0.1:
+                row.extend(str(rng.randint(1, 999)))
+                row.append(".")
+            elif draw < 0.13:
+                row.append(rng.choice("*#+$/@%=&-"))
+            else:
+                row.append(".")
+        yield "".join(row[:size])
+
+
+def generate_day4(rng: random.Random, size: int) -> Iterator[str]:
+    """'size' scratchcards with 10 winning numbers and 25 numbers"""
+    for card in range(1, size + 1):
+        winning = " ".join(f"{n:>2}" for n in rng.sample(range(1, 100), 10))
+        numbers = " ".join(f"{n:>2}" for n in rng.sample(range(1, 100), 25))
+        yield f"Card {card:>3}: {winning} | {numbers}"
+
+
+def generate_day5(rng: random.Random, size: int) -> Iterator[str]:
+    """An almanac of 'size' seed ranges and 7 maps of 'size' lines each"""
+    max_id = 2**32
+    seeds: List[str] = []
+    for _ in range(size):
+        start = rng.randrange(max_id)
+        seeds += [str(start), str(rng.randint(1, max((max_id - start) // size, 1)))]
+    yield "seeds: " + " ".join(seeds)
+    names = [
+        "seed",
+        "soil",
+        "fertilizer",
+        "water",
+        "light",
+        "temperature",
+        "humidity",
+        "location",
+    ]
+    for source, destination in zip(names[:-1], names[1:]):
+        yield ""
+        yield f"{source}-to-{destination} map:"
+        # Split [0 ; max_id[ into 'size' ranges mapped to random destinations
+        bounds = sorted(rng.sample(range(1, max_id), size - 1)) if size > 1 else []
+        for start, stop in zip([0] + bounds, bounds + [max_id]):
+            yield f"{rng.randrange(max_id - (stop - start) + 1)} {start} {stop - start}"
+
+
+def generate_day6(rng: random.Random, size: int) -> Iterator[str]:
+    """'size' races (part 2 concatenates them into numbers of ~2*size digits)"""
+    times = [rng.randint(7, 99) for _ in range(size)]
+    distances = [rng.randint(t, t * t // 4 - 1) for t in times]
+    yield "Time:     " + " ".join(f"{t:>6}" for t in times)
+    yield "Distance: " + " ".join(f"{d:>6}" for d in distances)
+
+
+def generate_day7(rng: random.Random, size: int) -> Iterator[str]:
+    """'size' camel cards hands with their bid"""
+    for _ in range(size):
+        hand = "".join(rng.choice("23456789TJQKA") for _ in range(5))
+        yield f"{hand} {rng.randint(1, 1000)}"
+
+
+def generate_day8(rng: random.Random, size: int) -> Iterator[str]:
+    """
+    A network of about 'size' nodes
+
+    The nodes form up to 6 cycles, each one goes from a node ending with 'A'
+    to a node ending with 'Z' ('AAA' to 'ZZZ' for the first one) and then
+    loops with the same period, as expected by the solution of part 2.
+    """
+    letters = "BCDEFGHIJKLMNOPQRSTUVWXY"
+    width = 3
+    while len(letters) ** width < size:
+        width += 1
+
+    def name(index: int, length: int) -> str:
+        res = ""
+        for _ in range(length):
+            index, digit = divmod(index, len(letters))
+            res += letters[digit]
+        return res
+
+    yield "".join(rng.choice("LR") for _ in range(rng.randint(5, 300)))
+    yield ""
+    cycles = max(1, min(6, size // 3))
+    node = 0
+    for cycle in range(cycles):
+        start, end = (
+            ("AAA", "ZZZ")
+            if cycle == 0
+            else (
+                name(cycle, width - 1) + "A",
+                name(cycle, width - 1) + "Z",
+            )
+        )
+        length = max(2, size // cycles + rng.randint(-5, 5))
+        chain = [start] + [name(node + i, width) for i in range(length - 1)] + [end]
+        node += length - 1
+        for current, following in zip(chain, chain[1:] + [chain[1]]):
+            yield f"{current} = ({following}, {following})"
+
+
+def generate_day9(rng: random.Random, size: int) -> Iterator[str]:
+    """'size' histories of 21 values following a polynomial"""
+    for _ in range(size):
+        coefs = [rng.randint(-5, 5) for _ in range(rng.randint(1, 6))]
+        yield " ".join(
+            str(sum(c * x**power for power, c in enumerate(coefs))) for x in range(21)
+        )
+
+
+def generate_day10(rng: random.Random, size: int) -> Iterator[str]:
+    """A 'size'x'size' field of pipes with a skyline shaped loop"""
+    if size < 4:
+        raise AdventOfCodeException("The day10 maze requires a size of at least 4")
+    grid = [[rng.choice("|-LJ7F.") for _ in range(size)] for _ in range(size)]
+    # The buildings are at most 3 wide so that the loop fits in the grid
+    moves = skyline(rng, max(1, (size - 2) // 3), 3, size - 3)
+    vector = {"U": (-1, 0), "D": (1, 0), "R": (0, 1), "L": (0, -1)}
+    pipe = {
+        ("U", "U"): "|",
+        ("D", "D"): "|",
+        ("R", "R"): "-",
+        ("L", "L"): "-",
+        ("U", "R"): "F",
+        ("L", "D"): "F",
+        ("U", "L"): "7",
+        ("R", "D"): "7",
+        ("D", "R"): "L",
+        ("L", "U"): "L",
+        ("D", "L"): "J",
+        ("R", "U"): "J",
+    }
+    row, col = size - 1, 0
+    steps: List[str] = [direct for direct, dist in moves for _ in range(dist)]
+    for index, direct in enumerate(steps):
+        grid[row][col] = pipe[(steps[index - 1], direct)]
+        row, col = row + vector[direct][0], col + vector[direct][1]
+    # The start must only be connected to the loop
+    grid[row][col] = "S"
+    for d_row, d_col in vector.values():
+        if 0 <= row + d_row < size and 0 <= col + d_col < size:
+            if (row + d_row, col + d_col) not in ((row - 1, col), (row, col + 1)):
+                grid[row + d_row][col + d_col] = "."
+    for line in grid:
+        yield "".join(line)
+
+
+def generate_day11(rng: random.Random, size: int) -> Iterator[str]:
+    """A 'size'x'size' image with ~2% of galaxies"""
+    empty_rows = set(rng.sample(range(size), size // 10))
+    empty_cols = set(rng.sample(range(size), size // 10))
+    for row in range(size):
+        yield "".join(
+            (
+                "#"
+                if row not in empty_rows
+                and col not in empty_cols
+                and rng.random() < 0.02
+                else "."
+            )
+            for col in range(size)
+        )
+
+
+def generate_day12(rng: random.Random, size: int) -> Iterator[str]:
+    """1000 spring records of length 'size' (half of the springs are unknown)"""
+    for _ in range(1000):
+        groups: List[int] = []
+        while not groups:
+            springs = "".join(rng.choice("#..") for _ in range(size))
+            groups = [len(group) for group in springs.split(".") if group]
+        record = "".join("?" if rng.random() < 0.5 else s for s in springs)
+        yield f"{record} {','.join(str(group) for group in groups)}"
+
+
+def generate_day13(rng: random.Random, size: int) -> Iterator[str]:
+    """'size' patterns having a perfect reflection"""
+    for index in range(size):
+        rows, cols = rng.randint(5, 17), rng.randint(5, 17)
+        mirror = [[rng.choice("#.") for _ in range(cols)] for _ in range(rows)]
+        line = rng.randint(1, rows - 1)
+        for k in range(min(line, rows - line)):
+            mirror[line + k] = list(mirror[line - 1 - k])
+        if rng.random() < 0.5:
+            mirror = [list(col) for col in zip(*mirror)]
+        if index:
+            yield ""
+        for row in mirror:
+            yield "".join(row)
+
+
+def generate_day14(rng: random.Random, size: int) -> Iterator[str]:
+    """A 'size'x'size' platform of rounded and cube-shaped rocks"""
+    for _ in range(size):
+        yield "".join(rng.choices("O#.", weights=(15, 10, 75), k=size))
+
+
+def generate_day15(rng: random.Random, size: int) -> Iterator[str]:
+    """An initialization sequence of 'size' steps"""
+    labels = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 6)))
+        for _ in range(max(1, size // 4))
+    ]
+    yield ",".join(
+        (
+            f"{rng.choice(labels)}={rng.randint(1, 9)}"
+            if rng.random() < 0.7
+            else f"{rng.choice(labels)}-"
+        )
+        for _ in range(size)
+    )
+
+
+def generate_day16(rng: random.Random, size: int) -> Iterator[str]:
+    """A 'size'x'size' contraption with ~10% of mirrors and splitters"""
+    for _ in range(size):
+        yield "".join(rng.choices(".|-/\\", weights=(90, 3, 3, 2, 2), k=size))
+
+
+def generate_day17(rng: random.Random, size: int) -> Iterator[str]:
+    """A 'size'x'size' heat loss map"""
+    for _ in range(size):
+        yield "".join(rng.choices("123456789", k=size))
+
+
+def generate_day18(rng: random.Random, size: int) -> Iterator[str]:
+    """
+    A dig plan of 'size' buildings (2*size+2 instructions)
+
+    The instructions and the colors both describe a clockwise skyline which
+    never crosses itself.
+    """
+    moves = skyline(rng, size, 10, 20)
+    # The distances of the colors are written with 5 hexadecimal digits
+    colors = skyline(rng, size, 0xFFFFF // size, 0xFFFFF)
+    encoding = {"R": "0", "D": "1", "L": "2", "U": "3"}
+    for (direct, dist), (color_direct, color_dist) in zip(moves, colors):
+        yield f"{direct} {dist} (#{color_dist:05x}{encoding[color_direct]})"
+
+
+def generate_day19(rng: random.Random, size: int) -> Iterator[str]:
+    """
+    'size' workflows and 'size' parts
+
+    The workflows form a tree rooted at 'in'. Each condition splits the
+    ratings which can reach its workflow into two non empty sets (the
+    solution of part 2 doesn't support impossible conditions).
+    """
+
+    def name(index: int) -> str:
+        res = ""
+        while index or len(res) < 2:
+            index, letter = divmod(index, 26)
+            res += string.ascii_lowercase[letter]
+        return "zin" if res == "in" else res
+
+    Box = Dict[str, Tuple[int, int]]
+    queue: Deque[Tuple[str, Box]] = deque([("in", {k: (1, 4001) for k in "xmas"})])
+    created = 1
+
+    def target(box: Box) -> str:
+        nonlocal created
+        if created < size and rng.random() < 0.6:
+            queue.append((name(created), box))
+            created += 1
+            return queue[-1][0]
+        return rng.choice("AR")
+
+    while queue:
+        workflow, box = queue.popleft()
+        rules: List[str] = []
+        for _ in range(rng.randint(1, 4)):
+            keys = [key for key, (low, high) in box.items() if high - low > 2]
+            if not keys:
+                break
+            key = rng.choice(keys)
+            low, high = box[key]
+            value = rng.randint(low + 1, high - 2)
+            if rng.random() < 0.5:
+                matched, box = {**box, key: (low, value)}, {**box, key: (value, high)}
+                rules.append(f"{key}<{value}:{target(matched)}")
+            else:
+                matched = {**box, key: (value + 1, high)}
+                box = {**box, key: (low, value + 1)}
+                rules.append(f"{key}>{value}:{target(matched)}")
+        rules.append(target(box))
+        yield f"{workflow}{{{','.join(rules)}}}"
+    yield ""
+    for _ in range(size):
+        x, m, a, s = (rng.randint(1, 4000) for _ in range(4))
+        yield f"{{x={x},m={m},a={a},s={s}}}"
+
+
+GENERATORS: Dict[int, Generator] = {
+    1: generate_day1,
+    2: generate_day2,
+    3: generate_day3,
+    4: generate_day4,
+    5: generate_day5,
+    6: generate_day6,
+    7: generate_day7,
+    8: generate_day8,
+    9: generate_day9,
+    10: generate_day10,
+    11: generate_day11,
+    12: generate_day12,
+    13: generate_day13,
+    14: generate_day14,
+    15: generate_day15,
+    16: generate_day16,
+    17: generate_day17,
+    18: generate_day18,
+    19: generate_day19,
+}
+
+
+def write_input(day: int, path: Path, size: int, seed: int = 2023) -> Path:
+    """Write a generated input for a day"""
+    if day not in GENERATORS:
+        raise AdventOfCodeException(f"No generator for day{day}")
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for line in GENERATORS[day](rng, size):
+            f.write(line + "\n")
+    return path
+
+
+def generate(days: List[int], size: int, seed: int, output: Path) -> Dict[int, Path]:
+    """Write a dayN.txt input for each day into the 'output' directory"""
+    output.mkdir(parents=True, exist_ok=True)
+    paths: Dict[int, Path] = {}
+    for day in days:
+        paths[day] = write_input(day, output / f"day{day}.txt", size, seed)
+        logger.info("Generated %s (size=%d, seed=%d)", paths[day], size, seed)
+    return paths
@@ -0,0 +1,111 @@
+from typing import Any, Dict, Iterator, List, Tuple
+
+from utils.error import AdventOfCodeException
+
+Position = Tuple[int, int]
+
+
+class Grid:
+    """
+    2D grid of bytes stored row by row in a flat bytearray.
+
+    The grid is surrounded by a padding of 'border' bytes, so the neighbors
+    of a cell are read without any bounds check. A cell is addressed by its
+    flat index: (row + pad) * stride + col + pad. Flag planes are bytearrays
+    of the same size to store a state per cell next to the grid (e.g. visited
+    directions as bits), they are not pickled.
+    """
+
+    def __init__(self, rows: int, cols: int, border: int = 0, pad: int = 1) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.pad = pad
+        self.border = border
+        self.stride = cols + 2 * pad
+        self.cells = bytearray([border]) * (self.stride * (rows + 2 * pad))
+        self.planes: Dict[str, bytearray] = {}
+        # Zeros copied over a plane to clear it, allocated on first use
+        self.zeros = b""
+
+    @classmethod
+    def from_lines(cls, lines: List[str], border: int = 0, pad: int = 1) -> "Grid":
+        """Create a grid of the ASCII codes of the characters of 'lines'"""
+        grid = cls(len(lines), len(lines[0]) if lines else 0, border, pad)
+        for row, line in enumerate(lines):
+            if len(line) != grid.cols:
+                raise AdventOfCodeException(
+                    f"Line {row} has {len(line)} characters instead of {grid.cols}"
+                )
+            start, end = grid.index(row, 0), grid.index(row, grid.cols)
+            grid.cells[start:end] = line.encode("ascii")
+        return grid
+
+    def index(self, row: int, col: int) -> int:
+        return (row + self.pad) * self.stride + col + self.pad
+
+    def position(self, index: int) -> Position:
+        row, col = divmod(index, self.stride)
+        return row - self.pad, col - self.pad
+
+    def __getitem__(self, pos: Position) -> str:
+        return chr(self.cells[self.index(*pos)])
+
+    def __setitem__(self, pos: Position, value: str) -> None:
+        self.cells[self.index(*pos)] = ord(value)
+
+    def is_inside(self, pos: Position) -> bool:
+        return 0 <= pos[0] < self.rows and 0 <= pos[1] < self.cols
+
+    def offsets(self, diagonal: bool = False) -> Tuple[int, ...]:
+        """Index deltas of the north, south, east and west (then diagonal) cells"""
+        orthogonal = (-self.stride, self.stride, 1, -1)
+        if not diagonal:
+            return orthogonal
+        return orthogonal + tuple(
+            row + col for row in (-self.stride, self.stride) for col in (1, -1)
+        )
+
+    def neighbors(self, index: int, diagonal: bool = False) -> Iterator[int]:
+        """Indices of the neighbors of a cell which are not in the border"""
+        cells, border = self.cells, self.border
+        for offset in self.offsets(diagonal):
+            if cells[index + offset] != border:
+                yield index + offset
+
+    def row_indices(self, row: int) -> range:
+        start = self.index(row, 0)
+        return range(start, start + self.cols)
+
+    def indices(self) -> Iterator[int]:
+        """Indices of the cells of the grid row by row (without the border)"""
+        for row in range(self.rows):
+            yield from self.row_indices(row)
+
+    def find(self, value: str) -> int:
+        """Return the index of the first cell with this value (-1 if none)"""
+        # The value is expected to differ from the border
+        return self.cells.find(value.encode("ascii"))
+
+    def plane(self, name: str) -> bytearray:
+        """Return the flag plane 'name', created zeroed on first use"""
+        if name not in self.planes:
+            self.planes[name] = bytearray(len(self.cells))
+        return self.planes[name]
+
+    def clear(self, name: str) -> None:
+        """Reset a flag plane to 0 at once, in place"""
+        plane = self.plane(name)
+        if len(self.zeros) != len(plane):
+            self.zeros = bytes(len(plane))
+        # Same length: the plane is overwritten without being resized
+        plane[:] = self.zeros
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The flag planes are a state of the process, they are not copied
+        return {**self.__dict__, "planes": {}, "zeros": b""}
+
+    def lines(self) -> List[str]:
+        return [
+            "".join(map(chr, self.cells[slice(row.start, row.stop)]))
+            for row in map(self.row_indices, range(self.rows))
+        ]
@@ -0,0 +1,114 @@
+import argparse
+import importlib
+import re
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.error import AdventOfCodeException
+
+# Static manifest of the solutions shipped with the repository (id -> module)
+MANIFEST: Dict[int, str] = {id: f"day{id}" for id in range(1, 20)}
+# Third party solutions could be registered with an entry point such as:
+#   [project.entry-points."adventofcode.days"]
+#   day20 = "my_package.day20"
+ENTRY_POINT_GROUP = "adventofcode.days"
+
+
+class Day:
+    """A solution which is only imported when it is used"""
+
+    def __init__(self, id: int, module_name: str) -> None:
+        self.id = id
+        self.module_name = module_name
+        self._module: Optional[ModuleType] = None
+
+    @property
+    def module(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self.module_name)
+        return self._module
+
+    @property
+    def solution(self) -> Callable[..., int]:
+        return getattr(self.module, f"day{self.id}")
+
+    def get_parser(self) -> argparse.ArgumentParser:
+        return getattr(self.module, f"get_parser_day{self.id}")()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # A module can't be pickled, the worker process will import it again
+        return {**self.__dict__, "_module": None}
+
+    def __str__(self) -> str:
+        return f"day{self.id}"
+
+
+class DayRegistry:
+    """Discover the solutions without importing them"""
+
+    def __init__(self) -> None:
+        self.days: Dict[int, Day] = {}
+
+    def register(self, id: int, module_name: str) -> None:
+        self.days[id] = Day(id, module_name)
+
+    def load_manifest(self, manifest: Dict[int, str] = MANIFEST) -> None:
+        for id, module_name in manifest.items():
+            self.register(id, module_name)
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP) -> None:
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:  # pragma: no cover (python < 3.8)
+            return
+        eps = entry_points()
+        # 'select' is only available since python 3.10
+        group_eps = (
+            eps.select(group=group) if hasattr(eps, "select") else eps.get(group, [])
+        )
+        for ep in group_eps:
+            match = re.search(r"(\d+)$", ep.name)
+            if not match:
+                raise AdventOfCodeException(
+                    f"Invalid day name for entry point {ep.name}"
+                )
+            self.register(int(match.group(1)), ep.value.split(":")[0])
+
+    def select(self, ids: Iterable[int]) -> List[Day]:
+        ids = sorted(set(ids))
+        unknown = [id for id in ids if id not in self.days]
+        if unknown:
+            raise AdventOfCodeException(f"Unknown day(s): {unknown}")
+        return [self.days[id] for id in ids]
+
+
+def parse_days(value: str) -> List[int]:
+    """Parse a day selector such as '3,5,12', 'day3,Day5' or '10-12'"""
+    ids: List[int] = []
+    for item in value.split(","):
+        match = re.fullmatch(
+            r"\s*(?:day)?(\d+)(?:-(?:day)?(\d+))?\s*", item, re.IGNORECASE
+        )
+        if not match:
+            raise argparse.ArgumentTypeError(f"invalid day selector: '{item}'")
+        first, last = int(match.group(1)), int(match.group(2) or match.group(1))
+        ids.extend(range(first, last + 1))
+    return ids
+
+
+def get_registry() -> DayRegistry:
+    registry = DayRegistry()
+    registry.load_manifest()
+    registry.load_entry_points()
+    return registry
+
+
+def get_selector_parser() -> argparse.ArgumentParser:
+    """Create a parser for the day selection (shared by every command)."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--days",
+        type=parse_days,
+        help="comma separated list of days to run e.g. 3,5,12 (default: $SOLUTION or all)",
+    )
+    return parser
@@ -0,0 +1,104 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from logging import Handler, Logger, LogRecord
+from typing import Any, Dict, List, Tuple
+
+from utils.logger import MyLogger
+from utils.registry import Day
+
+logger: Logger = MyLogger().get_logger()
+
+Task = Tuple[Day, bool]
+
+
+class TaskResult:
+    """Outcome of one (day, part) execution"""
+
+    def __init__(
+        self, day: int, part2: bool, messages: List[str], elapsed: float
+    ) -> None:
+        self.day = day
+        self.part2 = part2
+        self.messages = messages
+        self.elapsed = elapsed
+
+    def __str__(self) -> str:
+        return f"day{self.day} PART{2 if self.part2 else 1} in {self.elapsed:.3f}s"
+
+
+class BufferHandler(Handler):
+    """Keep the log messages in memory instead of printing them"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: List[str] = []
+
+    def emit(self, record: LogRecord) -> None:
+        self.messages.append(self.format(record))
+
+
+def parse_jobs(value: str) -> int:
+    """Parse the number of processes of the pool (at least 1)"""
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number of jobs: '{value}'")
+    if jobs < 1:
+        raise argparse.ArgumentTypeError(f"the number of jobs must be >= 1: {jobs}")
+    return jobs
+
+
+def run_task(day: Day, part2: bool, kwargs: Dict[str, Any]) -> TaskResult:
+    """
+    Execute the solution of a day and capture what it logs.
+
+    The messages are buffered so the caller can print them in a fixed
+    order whatever the order in which the tasks complete.
+    """
+    solution = day.solution
+    handlers, buffer = logger.handlers, BufferHandler()
+    logger.handlers = [buffer]
+    try:
+        start = time.perf_counter()
+        solution(part2=part2, **kwargs)
+        elapsed = time.perf_counter() - start
+    finally:
+        logger.handlers = handlers
+    return TaskResult(day.id, part2, buffer.messages, elapsed)
+
+
+def run_parallel(tasks: List[Task], jobs: int, **kwargs) -> List[TaskResult]:
+    """
+    Dispatch each (day, part) task to a pool of processes.
+
+    Results are printed in the order of 'tasks', followed by the wall time of
+    each task and the speedup compared to a serial execution estimated by the
+    sum of the wall times of the tasks (a day may run its own pool of
+    processes, their CPU time is not seen by the task).
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(run_task, day, part2, kwargs) for day, part2 in tasks
+        ]
+        results: List[TaskResult] = []
+        for future in futures:
+            result: TaskResult = future.result()
+            for message in result.messages:
+                logger.info(message)
+            results.append(result)
+    elapsed = time.perf_counter() - start
+
+    logger.info("")
+    for result in results:
+        logger.info("⏱  %s", result)
+    serial = sum(result.elapsed for result in results)
+    logger.info(
+        "Total: %.3fs with %d jobs (serial: %.3fs, speedup: x%.2f)",
+        elapsed,
+        jobs,
+        serial,
+        serial / elapsed if elapsed else 1.0,
+    )
+    return results
@@ -0,0 +1,228 @@
+import argparse
+import importlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+from ..bench import (
+    find_regressions,
+    parse_repeat,
+    parse_threshold,
+    parse_variants,
+    peak_rss,
+    percentile,
+    run_bench,
+)
+from ..error import AdventOfCodeException
+from ..generator import GENERATORS, write_input
+from ..grid import Grid
+from ..logger import MyLogger
+from ..registry import get_registry, parse_days
+from ..runner import BufferHandler, parse_jobs, run_parallel, run_task
+
+
+class TestRegistry(unittest.TestCase):
+    def test_parse_days(self):
+        self.assertEqual(parse_days("3,5,12"), [3, 5, 12])
+        self.assertEqual(parse_days("Day1,day10-12"), [1, 10, 11, 12])
+
+    def test_select_unknown_day(self):
+        with self.assertRaises(AdventOfCodeException):
+            get_registry().select([0])
+
+    def test_select_is_lazy(self):
+        days = get_registry().select([6, 4])
+        self.assertEqual([day.id for day in days], [4, 6])
+        self.assertNotIn("day6.main", sys.modules)
+        self.assertEqual(days[1].solution.__name__, "day6")
+        self.assertIn("day6.main", sys.modules)
+
+
+class TestBench(unittest.TestCase):
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+
+    def test_bench_options(self):
+        self.assertEqual(parse_repeat("3"), 3)
+        self.assertEqual(parse_threshold("0"), 0.0)
+        for parse, value in ((parse_repeat, "0"), (parse_threshold, "-0.1")):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse(value)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            parse_threshold("nan")
+
+    def test_peak_rss(self):
+        # A 64MB buffer can't be hidden by the peak of another process
+        buffer = bytearray(64 * 1024 * 1024)
+        self.assertGreaterEqual(peak_rss(), len(buffer) // 1024)
+
+    def test_find_regressions(self):
+        baseline = {"day1": {"part1": {"median": 1.0}, "part2": {"median": 1.0}}}
+        report = {"day1": {"part1": {"median": 1.1}, "part2": {"median": 1.5}}}
+        regressions = find_regressions(report, baseline, threshold=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("day1 part2"))
+
+    def test_run_bench_with_baseline(self):
+        day = get_registry().select([9])[0]
+        tasks, kwargs = [(day, False)], vars(day.get_parser().parse_args([]))
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            report = run_bench(tasks, repeat=1, output=output, **kwargs)
+            self.assertEqual(list(report), ["day9"])
+            self.assertEqual(list(report["day9"]), ["part1"])
+            # The same run is not a regression of itself
+            run_bench(tasks, repeat=1, baseline=output, threshold=100, **kwargs)
+            with open(output, "w") as f:
+                json.dump({"results": {"day9": {"part1": {"median": -1.0}}}}, f)
+            with self.assertRaises(AdventOfCodeException):
+                run_bench(tasks, repeat=1, baseline=output, **kwargs)
+
+    def test_run_bench_compare(self):
+        day = get_registry().select([9])[0]
+        tasks, kwargs = [(day, False)], vars(day.get_parser().parse_args([]))
+        data = str(kwargs["data_day9"])
+        variants = parse_variants(f"data-day9={data},{data}")
+        report = run_bench(tasks, repeat=1, compare=variants, **kwargs)
+        self.assertEqual(list(report), [f"day9[data_day9={data}]"])
+        # An option of no selected day is a typo
+        with self.assertRaises(AdventOfCodeException):
+            run_bench(
+                tasks, repeat=1, compare=parse_variants("queue_day9=heap"), **kwargs
+            )
+
+    def test_run_bench_baseline_is_output(self):
+        day = get_registry().select([9])[0]
+        tasks, kwargs = [(day, False)], vars(day.get_parser().parse_args([]))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.json")
+            with open(path, "w") as f:
+                json.dump({"results": {"day9": {"part1": {"median": -1.0}}}}, f)
+            # The baseline is compared before it is overwritten by the output
+            with self.assertRaises(AdventOfCodeException):
+                run_bench(tasks, repeat=1, output=path, baseline=path, **kwargs)
+            with open(path) as f:
+                self.assertGreater(
+                    json.load(f)["results"]["day9"]["part1"]["median"], 0
+                )
+
+
+class TestRunner(unittest.TestCase):
+    def test_run_task(self):
+        day = get_registry().select([9])[0]
+        kwargs = vars(day.get_parser().parse_args([]))
+        result = run_task(day, True, kwargs)
+        self.assertEqual((result.day, result.part2), (9, True))
+        self.assertEqual(len(result.messages), 1)
+        self.assertIn("day9 PART2", result.messages[0])
+        self.assertGreaterEqual(result.elapsed, 0)
+
+    def test_parse_jobs(self):
+        self.assertEqual(parse_jobs("4"), 4)
+        for value in ("0", "-2", "many"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_jobs(value)
+
+    def test_run_parallel(self):
+        days = get_registry().select([9, 11])
+        kwargs: dict = {}
+        for day in days:
+            kwargs.update(vars(day.get_parser().parse_args([])))
+        tasks = [(days[1], True), (days[0], False), (days[0], True)]
+        logger, buffer = MyLogger().get_logger(), BufferHandler()
+        logger.addHandler(buffer)
+        try:
+            results = run_parallel(tasks, 2, **kwargs)
+        finally:
+            logger.removeHandler(buffer)
+        self.assertEqual(
+            [(result.day, result.part2) for result in results],
+            [(11, True), (9, False), (9, True)],
+        )
+        solutions = [line for line in buffer.messages if "solution" in line]
+        self.assertEqual(len(solutions), 3)
+        for line, (day, part2) in zip(solutions, tasks):
+            self.assertIn(f"{day} PART{2 if part2 else 1}", line)
+        self.assertTrue(buffer.messages[-1].startswith("Total:"))
+
+
+class TestGenerator(unittest.TestCase):
+    def test_every_day_has_a_generator(self):
+        self.assertEqual(sorted(GENERATORS), list(range(1, 20)))
+
+    def test_generator_is_reproducible(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = write_input(17, os.path.join(directory, "1.txt"), 20, seed=1)
+            second = write_input(17, os.path.join(directory, "2.txt"), 20, seed=1)
+            with open(first) as f1, open(second) as f2:
+                content = f1.read()
+                self.assertEqual(content, f2.read())
+        self.assertEqual(len(content.split()), 20)
+
+    def test_generated_day6_part2(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_input(6, os.path.join(directory, "6.txt"), 100)
+            try:
+                races = importlib.import_module("day6.main").parse_data(path, True)
+            finally:
+                # Keep the other tests able to check that day6 is imported lazily
+                for name in ("day6.main", "day6"):
+                    sys.modules.pop(name, None)
+        # Hundreds of digits: the roots must be exact
+        (t,), (d,) = races.time, races.distance
+        self.assertGreater(t, 2**53)
+        (count,) = races.beat_the_record()
+        first = (t - count + 1) // 2
+        self.assertEqual(t - 2 * first + 1, count)
+        self.assertGreater(first * (t - first), d)
+        self.assertLessEqual((first - 1) * (t - first + 1), d)
+
+    def test_generated_input_is_valid(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for day in (10, 12, 19):
+                path = write_input(day, os.path.join(directory, f"{day}.txt"), 12)
+                solution = get_registry().select([day])[0].solution
+                self.assertGreaterEqual(solution(**{f"data_day{day}": path}), 0)
+                self.assertGreaterEqual(
+                    solution(part2=True, **{f"data_day{day}": path}), 0
+                )
+
+
+class TestGrid(unittest.TestCase):
+    def test_from_lines(self):
+        grid = Grid.from_lines(["ab", "cd", "ef"])
+        self.assertEqual((grid.rows, grid.cols, grid.stride), (3, 2, 4))
+        self.assertEqual(grid[2, 1], "f")
+        self.assertEqual(grid.position(grid.index(2, 1)), (2, 1))
+        self.assertEqual(grid.position(grid.find("d")), (1, 1))
+        self.assertEqual(grid.lines(), ["ab", "cd", "ef"])
+        with self.assertRaises(AdventOfCodeException):
+            Grid.from_lines(["ab", "c", "ef"])
+
+    def test_neighbors(self):
+        grid = Grid.from_lines(["ab", "cd", "ef"])
+        corner = [grid[grid.position(i)] for i in grid.neighbors(grid.index(0, 0))]
+        self.assertEqual(corner, ["c", "b"])
+        center = grid.neighbors(grid.index(1, 0), diagonal=True)
+        self.assertEqual(sorted(grid[grid.position(i)] for i in center), list("abdef"))
+
+    def test_planes(self):
+        grid = Grid.from_lines(["ab", "cd"])
+        grid.plane("seen")[grid.index(1, 1)] = 1
+        self.assertEqual(sum(grid.plane("seen")), 1)
+        copy = pickle.loads(pickle.dumps(grid))
+        self.assertEqual(copy.lines(), ["ab", "cd"])
+        self.assertEqual(sum(copy.plane("seen")), 0)
+        plane = grid.plane("seen")
+        grid.clear("seen")
+        self.assertEqual(sum(grid.plane("seen")), 0)
+        # The plane is cleared in place
+        self.assertIs(grid.plane("seen"), plane)
+
+
+if __name__ == "__main__":
+    unittest.main()